@@ -0,0 +1,43 @@
+from nacl.signing import SigningKey
+from src.auth.reticulum_auth import ReticulumAuth
+from src.auth.storage_auth import StorageAuth
+from .harness import Case, benchmark
+
+@benchmark('auth.verify_token', cached=[True, False])
+async def verify_token(cached):
+    auth = ReticulumAuth()
+    session = await auth.authenticate('bench_user', 'site:read', SigningKey.generate())
+    token = session['token']
+    
+    async def op():
+        if not cached:
+            auth.cache.clear()
+        await auth.verify_token(token)
+        
+    return Case(op)
+
+@benchmark('auth.validate_access', cached=[True, False], grants=[10, 1000])
+async def validate_access(cached, grants):
+    auth = StorageAuth()
+    for i in range(grants):
+        await auth.authorize_access(f"user_{i}", f"/sites/{i}/", 'read')
+    grant = await auth.authorize_access('bench_user', '/sites/bench/', 'read')
+    token = grant['token']
+    
+    async def op():
+        if not cached:
+            auth.cache.clear()
+        await auth.validate_access(token, '/sites/bench/index.html', 'read')
+        
+    return Case(op, metrics={'grants': grants + 1})
+
+@benchmark('auth.authenticate')
+async def authenticate():
+    # Full challenge-response exchange including signing and verification
+    auth = ReticulumAuth()
+    key = SigningKey.generate()
+    
+    async def op():
+        await auth.authenticate('bench_user', 'site:read', key)
+        
+    return Case(op)
\ No newline at end of file
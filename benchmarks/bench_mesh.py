@@ -0,0 +1,44 @@
+from src.transport.mesh_networky import ReticulumMeshNetwork
+from src.transport.simulator import MeshSimulator
+from .harness import Case, benchmark
+
+WAVE = 32
+
+@benchmark('mesh.send_to_peer', nodes=[10, 100, 300], size=[200])
+async def send_to_peer(nodes, size):
+    # Waves of sends between random pairs, all starting at the same simulated
+    # time; latency and throughput are reported in simulated seconds
+    simulator = MeshSimulator(seed=nodes, loss=0.02)
+    ids = simulator.random_topology(nodes, degree=3)
+    networks = {}
+    for node_id in ids:
+        networks[node_id] = ReticulumMeshNetwork()
+        simulator.attach(networks[node_id], node_id)
+        await networks[node_id].initialize()
+        
+    await simulator.announce_all()
+    simulator.converge()
+    await simulator.advance(simulator.horizon)
+    data = b'x' * size
+    
+    async def send(a, b):
+        try:
+            await networks[a].send_to_peer(b, data)
+        except Exception:
+            pass
+            
+    async def op():
+        pairs = [simulator.random.sample(ids, 2) for _ in range(WAVE)]
+        started = simulator.now()
+        for a, b in pairs:
+            await send(a, b)
+        await simulator.advance(max(simulator.horizon - started, 0.0))
+        
+    metrics = {}
+    
+    async def teardown():
+        metrics.update(simulator.summary())
+        for network in networks.values():
+            await network.shutdown()
+            
+    return Case(op, metrics=metrics, teardown=teardown)
\ No newline at end of file
@@ -0,0 +1,14 @@
+from src.utils.metrics import MetricsRegistry
+from .harness import Case, benchmark
+
+@benchmark('metrics.overhead', enabled=[False, True])
+async def overhead(enabled):
+    # Cost added to a hot path by one counter, one histogram and one span
+    registry = MetricsRegistry(enabled=enabled)
+    
+    @registry.timed('bench_call')
+    async def call():
+        registry.inc('bench_total', peer='a')
+        registry.observe('bench_seconds', 0.01, peer='a')
+        
+    return Case(call)
\ No newline at end of file
@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+from .harness import Case, benchmark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = {
+    'browser': "from src.web.browser import DecentralizedBrowser; DecentralizedBrowser()",
+    'mesh': "from src.transport.mesh_networky import ReticulumMeshNetwork; ReticulumMeshNetwork()",
+    'auth': "from src.auth.reticulum_auth import ReticulumAuth; ReticulumAuth()"
+}
+
+async def run_python(code):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-c', code,
+        cwd=ROOT,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode:
+        raise RuntimeError(stderr.decode().strip().splitlines()[-1])
+
+@benchmark('startup.import', component=list(STARTUP))
+async def startup(component):
+    # Wall time of a fresh interpreter importing and constructing a component;
+    # compare against startup.interpreter for the bare Python cost
+    code = STARTUP[component]
+    
+    async def op():
+        await run_python(code)
+        
+    return Case(op)
+
+@benchmark('startup.interpreter')
+async def interpreter():
+    async def op():
+        await run_python('pass')
+        
+    return Case(op)
\ No newline at end of file
@@ -0,0 +1,80 @@
+import itertools
+import os
+import shutil
+import tempfile
+import tracemalloc
+from src.storage.remote_storage import RemoteStorageSystem
+from .harness import Case, benchmark
+
+SIZES = [256, 4096, 65536, 1048576]
+STREAM_SIZES = [1048576, 16777216]
+
+def temporary_storage():
+    storage = RemoteStorageSystem()
+    storage.storage_path = tempfile.mkdtemp(prefix='mesh-bench-')
+    return storage, lambda: shutil.rmtree(storage.storage_path, ignore_errors=True)
+
+@benchmark('storage.store_data', size=SIZES, encrypt=[True, False])
+async def store_data(size, encrypt):
+    storage, cleanup = temporary_storage()
+    data = os.urandom(size)
+    counter = itertools.count()
+    
+    async def op():
+        # Cycle over a bounded set of paths so disk usage stays flat
+        await storage.store_data(f"/bench/{next(counter) % 64}", data, {'encrypt': encrypt})
+        
+    return Case(op, bytes_per_op=size, teardown=cleanup)
+
+@benchmark('storage.retrieve_data', size=SIZES, encrypt=[True, False])
+async def retrieve_data(size, encrypt):
+    storage, cleanup = temporary_storage()
+    await storage.store_data("/bench/object", os.urandom(size), {'encrypt': encrypt})
+    
+    async def op():
+        await storage.retrieve_data("/bench/object")
+        
+    return Case(op, bytes_per_op=size, teardown=cleanup)
+
+def generate(size, chunk_size=65536):
+    block = os.urandom(chunk_size)
+    for offset in range(0, size, chunk_size):
+        yield block[:size - offset]
+
+async def peak_memory(coro):
+    # Peak Python allocations while the coroutine runs
+    tracemalloc.start()
+    try:
+        await coro
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+@benchmark('storage.store_stream', size=STREAM_SIZES)
+async def store_stream(size):
+    storage, cleanup = temporary_storage()
+    metrics = {
+        'peak_bytes_stream': await peak_memory(storage.store_stream("/bench/peak", generate(size))),
+        'peak_bytes_whole': await peak_memory(storage.store_data("/bench/peak", b''.join(generate(size))))
+    }
+    
+    async def op():
+        await storage.store_stream("/bench/object", generate(size))
+        
+    return Case(op, bytes_per_op=size, metrics=metrics, teardown=cleanup)
+
+@benchmark('storage.retrieve_stream', size=STREAM_SIZES)
+async def retrieve_stream(size):
+    storage, cleanup = temporary_storage()
+    await storage.store_stream("/bench/object", generate(size))
+    
+    async def drain():
+        async for _ in storage.retrieve_stream("/bench/object"):
+            pass
+            
+    metrics = {'peak_bytes_stream': await peak_memory(drain())}
+    
+    async def op():
+        await drain()
+        
+    return Case(op, bytes_per_op=size, metrics=metrics, teardown=cleanup)
\ No newline at end of file
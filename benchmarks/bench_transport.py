@@ -0,0 +1,33 @@
+import os
+from src.transport.secure_transport import SecureReticulumTransport
+from .harness import Case, benchmark
+
+@benchmark('transport.send_data', size=[64, 1024, 16384, 131072])
+async def send_data(size):
+    transport = SecureReticulumTransport()
+    session = await transport.establish_session('bench-peer')
+    
+    # Measure encryption and scheduling, not the regional airtime limit
+    transport.scheduler.configure_radio(duty_cycle=float('inf'))
+    data = os.urandom(size)
+    
+    await transport.send_data(session['id'], data)
+    stats = transport.scheduler.stats
+    on_air = stats['bytes_sent'] + stats['sent'] * transport.header_size
+    
+    async def op():
+        await transport.send_data(session['id'], data)
+        
+    async def teardown():
+        await transport.scheduler.stop()
+        
+    return Case(
+        op,
+        bytes_per_op=size,
+        metrics={
+            'fragments': stats['sent'],
+            'bytes_on_air': on_air,
+            'framing_overhead': on_air / size - 1.0
+        },
+        teardown=teardown
+    )
\ No newline at end of file
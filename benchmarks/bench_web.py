@@ -0,0 +1,75 @@
+import itertools
+from src.web.browser import BrowserCache
+from src.web.renderer import WebRenderer
+from .harness import Case, benchmark
+
+STYLESHEET = b"""
+body { font-family: sans-serif; line-height: 1.6; margin: 0; padding: 20px; }
+.container { max-width: 800px; margin: 0 auto; }
+nav a { margin-right: 10px; }
+"""
+
+def html_page(sections):
+    body = []
+    for i in range(sections):
+        body.append(f"""
+        <section id="s{i}">
+            <h2>Section {i}</h2>
+            <p>Mesh nodes relay <em>encrypted</em> fragments between peers.
+            See <a href="/page{i}.html">page {i}</a> or <a href="mesh://site/{i}">mirror</a>.</p>
+            <img src="/images/{i}.png" alt="Figure {i}">
+            <ul><li>Hop {i}</li><li>Airtime</li><li>Duty cycle</li></ul>
+        </section>""")
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>Benchmark page</title>
+    <link rel="stylesheet" href="style.css">
+</head>
+<body>
+    <div class="container">
+        <nav><a href="/index.html">Home</a><a href="/about.html">About</a></nav>
+        {''.join(body)}
+    </div>
+</body>
+</html>"""
+
+def markdown_page(sections):
+    return '\n\n'.join(
+        f"## Section {i}\n\nMesh nodes relay *encrypted* fragments.\n\n"
+        f"* [Page {i}](/page{i}.html)\n* Airtime\n* Duty cycle"
+        for i in range(sections)
+    )
+
+@benchmark('web.render', kind=['html', 'markdown'], sections=[5, 50])
+async def render(kind, sections):
+    renderer = WebRenderer()
+    text = html_page(sections) if kind == 'html' else markdown_page(sections)
+    content = {'type': kind, 'content': text.encode()}
+    
+    # Only full HTML documents have a head to inject styles into
+    resources = None
+    if kind == 'html':
+        resources = {'style.css': {'type': 'text/css', 'content': STYLESHEET}}
+        
+    async def op():
+        await renderer.render(content, resources)
+        
+    return Case(op, bytes_per_op=len(content['content']))
+
+@benchmark('web.cache_churn', entries=[100, 1000], payload=[1024])
+async def cache_churn(entries, payload):
+    # Keep inserting new sites into a full cache so every store evicts
+    cache = BrowserCache()
+    cache.max_size = entries * payload
+    data = 'x' * (payload - 8)
+    counter = itertools.count()
+    for _ in range(entries):
+        await cache.store_site(f"site-{next(counter)}", data)
+        
+    async def op():
+        site_id = f"site-{next(counter)}"
+        await cache.store_site(site_id, data)
+        await cache.get_site(site_id)
+        
+    return Case(op, metrics={'cached_sites': len(cache.cache)})
\ No newline at end of file
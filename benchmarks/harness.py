@@ -0,0 +1,178 @@
+import inspect
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BENCHMARKS = []
+
+class Case:
+    def __init__(self, op, bytes_per_op=None, metrics=None, teardown=None):
+        # op is an async callable timed once per iteration
+        self.op = op
+        self.bytes_per_op = bytes_per_op
+        self.metrics = {} if metrics is None else metrics
+        self.teardown = teardown
+
+def benchmark(name, **params):
+    # Register an async setup function; it is called once per parameter
+    # combination and returns the Case to time
+    def decorator(setup):
+        BENCHMARKS.append({
+            'name': name,
+            'setup': setup,
+            'params': params
+        })
+        return setup
+    return decorator
+
+def expand_params(params):
+    if not params:
+        return [{}]
+    keys = list(params)
+    return [
+        dict(zip(keys, values))
+        for values in itertools.product(*(params[key] for key in keys))
+    ]
+
+def case_key(result):
+    params = ','.join(f"{k}={v}" for k, v in sorted(result['params'].items()))
+    return f"{result['name']}[{params}]" if params else result['name']
+
+async def calibrate(op, min_time):
+    # Grow the inner loop until one round takes at least min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            await op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            return number
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+async def measure(case, rounds=5, min_time=0.05, warmup=1):
+    for _ in range(warmup):
+        await case.op()
+        
+    number = await calibrate(case.op, min_time)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            await case.op()
+        timings.append((time.perf_counter() - start) / number)
+        
+    median = statistics.median(timings)
+    stats = {
+        'rounds': rounds,
+        'number': number,
+        'min': min(timings),
+        'max': max(timings),
+        'mean': statistics.mean(timings),
+        'median': median,
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'ops_per_sec': 1.0 / median if median > 0 else None
+    }
+    if case.bytes_per_op and median > 0:
+        stats['bytes_per_sec'] = case.bytes_per_op / median
+    return stats
+
+async def run_benchmarks(pattern=None, rounds=5, min_time=0.05, warmup=1, report=None):
+    results = []
+    for entry in BENCHMARKS:
+        if pattern and pattern not in entry['name']:
+            continue
+            
+        for params in expand_params(entry['params']):
+            result = {'name': entry['name'], 'params': params}
+            case = None
+            try:
+                case = await entry['setup'](**params)
+                result.update(await measure(case, rounds, min_time, warmup))
+            except Exception as e:
+                # A broken path is reported, not fatal to the whole run
+                result['error'] = repr(e)
+            finally:
+                if case and case.teardown:
+                    cleanup = case.teardown()
+                    if inspect.isawaitable(cleanup):
+                        await cleanup
+                        
+            # Teardown may fill in metrics gathered during the run
+            if case:
+                result['metrics'] = case.metrics
+                
+            results.append(result)
+            if report:
+                report(result)
+                
+    return results
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+        
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'commit': commit
+    }
+
+def save_results(path, results):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare_results(baseline, current, threshold=0.1):
+    # Compare median time per case; ratio above 1 means slower
+    previous = {case_key(r): r for r in baseline['results'] if 'median' in r}
+    comparison = []
+    for result in current['results']:
+        key = case_key(result)
+        before = previous.get(key)
+        if before is None or 'median' not in result:
+            continue
+        ratio = result['median'] / before['median'] if before['median'] else None
+        comparison.append({
+            'case': key,
+            'baseline': before['median'],
+            'current': result['median'],
+            'ratio': ratio,
+            'regression': ratio is not None and ratio > 1 + threshold,
+            'improvement': ratio is not None and ratio < 1 - threshold
+        })
+    return comparison
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+def format_result(result):
+    key = case_key(result)
+    if 'error' in result:
+        return f"{key:<60} ERROR {result['error']}"
+        
+    line = f"{key:<60} {format_time(result['median']):>10} {result['ops_per_sec']:>12.1f} ops/s"
+    if 'bytes_per_sec' in result:
+        line += f" {result['bytes_per_sec'] / 1024:>10.1f} KiB/s"
+    return line
\ No newline at end of file
@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from . import (
+    bench_auth,
+    bench_mesh,
+    bench_metrics,
+    bench_startup,
+    bench_storage,
+    bench_transport,
+    bench_web
+)
+from .harness import (
+    compare_results,
+    environment,
+    format_result,
+    load_results,
+    run_benchmarks,
+    save_results
+)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the mesh web benchmark suite")
+    parser.add_argument('-k', '--filter', help="only run benchmarks whose name contains this")
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    parser.add_argument('-c', '--compare', help="baseline JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative slowdown reported as a regression (default 0.1)")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help="minimum seconds per timed round")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"Python {environment()['python']} on {environment()['platform']}")
+    
+    # Benchmarks get throwaway node keys, never the real node identity
+    with tempfile.TemporaryDirectory(prefix='mesh-bench-keys-') as key_dir:
+        os.environ['MESH_KEY_PATH'] = os.path.join(key_dir, 'node_key.json')
+        results = asyncio.run(run_benchmarks(
+            args.filter,
+            rounds=args.rounds,
+            min_time=args.min_time,
+            report=lambda result: print(format_result(result))
+        ))
+        
+    if args.output:
+        save_results(args.output, results)
+        print(f"Results written to {args.output}")
+        
+    regressions = []
+    if args.compare:
+        comparison = compare_results(load_results(args.compare), {'results': results}, args.threshold)
+        print(f"\nCompared with {args.compare}:")
+        for entry in comparison:
+            marker = 'REGRESSION' if entry['regression'] else 'faster' if entry['improvement'] else ''
+            print(f"{entry['case']:<60} {entry['ratio']:>6.2f}x {marker}")
+        regressions = [entry for entry in comparison if entry['regression']]
+        
+    errors = [result for result in results if 'error' in result]
+    if errors or (args.fail_on_regression and regressions):
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
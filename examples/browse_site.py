@@ -1,4 +1,5 @@
 import asyncio
+from nacl.signing import SigningKey
 from src.web import DecentralizedBrowser
 from src.auth import ReticulumAuth
 
@@ -6,12 +7,16 @@ async def browse_example_site(site_id):
     # Initialize components
     browser = DecentralizedBrowser()
     auth = ReticulumAuth()
+    # The user's own identity key, distinct from the node key; a real
+    # client would load a persistent one instead of generating it
+    client_key = SigningKey.generate()
     
     try:
         # Optional authentication
         auth_result = await auth.authenticate(
             user_id="example_user",
-            scope="site:read"
+            scope="site:read",
+            signing_key=client_key
         )
         
         # Load site
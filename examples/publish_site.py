@@ -1,4 +1,5 @@
 import asyncio
+from nacl.signing import SigningKey
 from src.web import ContentManager
 from src.auth import ReticulumAuth
 
@@ -6,6 +7,9 @@ async def publish_example_site():
     # Initialize components
     content_manager = ContentManager()
     auth = ReticulumAuth()
+    # The user's own identity key, distinct from the node key; a real
+    # client would load a persistent one instead of generating it
+    client_key = SigningKey.generate()
     
     # Example site content
     site_data = {
@@ -37,7 +41,7 @@ async def publish_example_site():
                 "type": "markdown",
                 "content": """
                 # About This Site
-
+                
                 This is an example of a decentralized website running on:
                 
                 * Reticulum mesh network
@@ -84,7 +88,8 @@ async def publish_example_site():
         # Authenticate (if needed)
         auth_result = await auth.authenticate(
             user_id="example_author",
-            scope="site:publish"
+            scope="site:publish",
+            signing_key=client_key
         )
         
         # Publish site
@@ -101,5 +106,4 @@ async def publish_example_site():
         raise
 
 if __name__ == "__main__":
-    asyncio.run(publish_example_site())
-
+    asyncio.run(publish_example_site())
\ No newline at end of file
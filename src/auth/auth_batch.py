@@ -0,0 +1,89 @@
+import struct
+
+AUTH_BATCH_REQUEST = 1
+AUTH_BATCH_CHALLENGE = 2
+AUTH_BATCH_RESPONSE = 3
+AUTH_BATCH_TOKEN = 4
+
+PACKET_HEADER = struct.Struct('>BB')
+ENTRY_HEADER = struct.Struct('>H')
+REQUEST_HEADER = struct.Struct('>32s16sI')
+CHALLENGE_FORMAT = struct.Struct('>16sI32s64s')
+RESPONSE_FORMAT = struct.Struct('>16s64s')
+# Request nonce and a random session handle standing in for the full token
+TOKEN_FORMAT = struct.Struct('>16s16s')
+
+CHALLENGE_DOMAIN = b'RAUTH-CHL'
+RESPONSE_DOMAIN = b'RAUTH-RSP'
+
+def pack_entries(packet_type, entries, packet_size=250):
+    packets = []
+    current = []
+    used = PACKET_HEADER.size
+    
+    for entry in entries:
+        check_fits(len(entry), packet_size)
+        needed = ENTRY_HEADER.size + len(entry)
+        if current and (used + needed > packet_size or len(current) == 255):
+            packets.append(build_packet(packet_type, current))
+            current = []
+            used = PACKET_HEADER.size
+        current.append(entry)
+        used += needed
+        
+    if current:
+        packets.append(build_packet(packet_type, current))
+    return packets
+
+def check_fits(entry_size, packet_size):
+    if PACKET_HEADER.size + ENTRY_HEADER.size + entry_size > packet_size:
+        raise ValueError(
+            f"Entry of {entry_size} bytes does not fit in a {packet_size} byte packet"
+        )
+
+def build_packet(packet_type, entries):
+    parts = [PACKET_HEADER.pack(packet_type, len(entries))]
+    for entry in entries:
+        parts.append(ENTRY_HEADER.pack(len(entry)))
+        parts.append(entry)
+    return b''.join(parts)
+
+def unpack_entries(packet, expected_type):
+    packet_type, count = PACKET_HEADER.unpack_from(packet, 0)
+    if packet_type != expected_type:
+        raise ValueError(f"Unexpected auth batch packet type {packet_type}")
+        
+    entries = []
+    offset = PACKET_HEADER.size
+    for _ in range(count):
+        # Entries cut off by a truncated packet are dropped
+        if offset + ENTRY_HEADER.size > len(packet):
+            break
+        (length,) = ENTRY_HEADER.unpack_from(packet, offset)
+        offset += ENTRY_HEADER.size
+        if offset + length > len(packet):
+            break
+        entries.append(packet[offset:offset + length])
+        offset += length
+    return entries
+
+def encode_request(public_key, nonce, timestamp, user_id, scope):
+    body = f"{user_id}\n{','.join(scope)}".encode()
+    return REQUEST_HEADER.pack(public_key, nonce, timestamp) + body
+
+def decode_request(entry):
+    public_key, nonce, timestamp = REQUEST_HEADER.unpack_from(entry, 0)
+    user_id, _, scope = entry[REQUEST_HEADER.size:].decode().partition('\n')
+    return {
+        'public_key': public_key,
+        'nonce': nonce,
+        'timestamp': timestamp,
+        'user_id': user_id,
+        'scope': [s for s in scope.split(',') if s]
+    }
+
+def challenge_payload(batch_nonce, timestamp, node_key):
+    return CHALLENGE_DOMAIN + batch_nonce + struct.pack('>I', timestamp) + node_key
+
+def response_payload(batch_nonce, request_nonce, node_key):
+    return RESPONSE_DOMAIN + batch_nonce + request_nonce + node_key
\ No newline at end of file
@@ -1,14 +1,201 @@
 from datetime import datetime, timedelta
+import json
+import os
+import struct
+import time
 import uuid
 from ..utils.crypto import CryptoHandler
+from ..utils.metrics import metrics
+from .verification_cache import VerificationCache
+from . import auth_batch
+
+PROTOCOL_VERSION = '1.0'
+
+AUTH_ERRORS = {
+    "AUTH001": "Invalid signature",
+    "AUTH002": "Invalid challenge response",
+    "AUTH003": "Token expired",
+    "AUTH004": "Invalid permissions",
+    "AUTH005": "Rate limit exceeded"
+}
+
+class AuthenticationError(Exception):
+    def __init__(self, code):
+        super().__init__(f"{code}: {AUTH_ERRORS[code]}")
+        self.code = code
+
+def encode_message_data(data):
+    return json.dumps(
+        data,
+        sort_keys=True,
+        separators=(',', ':'),
+        default=lambda value: value.decode() if isinstance(value, bytes) else str(value)
+    ).encode()
 
 class ReticulumAuth:
     def __init__(self):
         self.crypto = CryptoHandler()
         self.sessions = {}
         self.tokens = {}
+        self.cache = VerificationCache()
+        self.challenges = {}
+        # Unsigned batch requests get their own, smaller table so a flood
+        # of them cannot lock out the signed flow
+        self.batch_challenges = {}
+        self.identities = {}
+        self.max_clock_skew = timedelta(minutes=5)
+        self.challenge_lifetime = timedelta(minutes=2)
+        self.max_pending_challenges = 1024
+        self.max_pending_batch_challenges = 256
+        
+    @metrics.timed('auth_authenticate')
+    async def authenticate(self, user_id, scope, signing_key):
+        # In-process callers run the full challenge-response exchange,
+        # proving possession of the identity key bound to user_id
+        request = self.create_auth_request(signing_key, user_id, scope)
+        challenge = await self.handle_auth_request(request)
+        response = self.solve_challenge(signing_key, request, challenge)
+        return await self.complete_challenge(response)
+        
+    @staticmethod
+    def create_auth_request(signing_key, user_id, scope):
+        data = {
+            'id': user_id,
+            'public_key': bytes(signing_key.verify_key).hex(),
+            'nonce': os.urandom(32).hex(),
+            'timestamp': datetime.now().isoformat(),
+            'scope': scope
+        }
+        return {
+            'type': 'auth_request',
+            'version': PROTOCOL_VERSION,
+            'data': data,
+            'signature': signing_key.sign(encode_message_data(data)).signature.hex()
+        }
+        
+    @staticmethod
+    def solve_challenge(signing_key, request, challenge):
+        data = {
+            'response': signing_key.sign(
+                bytes.fromhex(challenge['data']['challenge'])
+            ).signature.hex(),
+            'nonce': request['data']['nonce'],
+            'timestamp': datetime.now().isoformat()
+        }
+        return {
+            'type': 'challenge_response',
+            'version': PROTOCOL_VERSION,
+            'data': data,
+            'signature': signing_key.sign(encode_message_data(data)).signature.hex()
+        }
         
-    async def authenticate(self, user_id, scope):
+    def sign_message(self, message_type, data):
+        return {
+            'type': message_type,
+            'version': PROTOCOL_VERSION,
+            'data': data,
+            'signature': self.crypto.sign_data(encode_message_data(data)).hex()
+        }
+        
+    def check_timestamp(self, timestamp):
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        elif isinstance(timestamp, int):
+            timestamp = datetime.fromtimestamp(timestamp)
+        return abs(datetime.now() - timestamp) <= self.max_clock_skew
+        
+    def bind_identity(self, user_id, public_key):
+        # Trust on first use: an identity stays bound to its first key
+        known = self.identities.setdefault(user_id, public_key)
+        return known == public_key
+        
+    def store_challenge(self, nonce, pending, batch=False):
+        if batch:
+            table, limit = self.batch_challenges, self.max_pending_batch_challenges
+        else:
+            table, limit = self.challenges, self.max_pending_challenges
+            
+        self.expire_challenges(table)
+        if len(table) >= limit:
+            raise AuthenticationError("AUTH005")
+        if nonce in table:
+            raise AuthenticationError("AUTH002")
+        table[nonce] = pending
+        
+    def expire_challenges(self, table):
+        now = datetime.now()
+        expired = [
+            nonce for nonce, pending in table.items()
+            if pending['expires_at'] < now
+        ]
+        for nonce in expired:
+            del table[nonce]
+            
+    async def handle_auth_request(self, request):
+        data = request['data']
+        public_key = bytes.fromhex(data['public_key'])
+        
+        if not CryptoHandler.verify_signature(
+            public_key,
+            encode_message_data(data),
+            bytes.fromhex(request['signature'])
+        ):
+            raise AuthenticationError("AUTH001")
+            
+        if not self.check_timestamp(data['timestamp']):
+            raise AuthenticationError("AUTH003")
+            
+        if not self.bind_identity(data['id'], public_key):
+            raise AuthenticationError("AUTH001")
+            
+        challenge = os.urandom(32)
+        self.store_challenge(data['nonce'], {
+            'user_id': data['id'],
+            'scope': data['scope'],
+            'public_key': public_key,
+            'challenge': challenge,
+            'expires_at': datetime.now() + self.challenge_lifetime
+        })
+        
+        return self.sign_message('auth_challenge', {
+            'challenge': challenge.hex(),
+            'nonce': os.urandom(32).hex(),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    async def complete_challenge(self, response):
+        data = response['data']
+        pending = self.challenges.pop(data['nonce'], None)
+        if not pending or pending['expires_at'] < datetime.now():
+            raise AuthenticationError("AUTH002")
+            
+        valid = CryptoHandler.verify_batch([
+            (
+                pending['public_key'],
+                encode_message_data(data),
+                bytes.fromhex(response['signature'])
+            ),
+            (
+                pending['public_key'],
+                pending['challenge'],
+                bytes.fromhex(data['response'])
+            )
+        ])
+        if not all(valid):
+            raise AuthenticationError("AUTH002")
+            
+        return await self.issue_session(pending['user_id'], pending['scope'])
+        
+    async def handle_challenge_response(self, response):
+        result = await self.complete_challenge(response)
+        session = self.sessions[result['session_id']]
+        return self.sign_message('auth_token', {
+            'token': result['token'],
+            'expires_at': result['expires_at'].isoformat(),
+            'permissions': session['scope']
+        })
+        
+    async def issue_session(self, user_id, scope, compact=False):
         session_id = str(uuid.uuid4())
         session = {
             'user_id': user_id,
@@ -18,7 +205,12 @@ class ReticulumAuth:
         }
         self.sessions[session_id] = session
         
-        token = await self.generate_token(session)
+        # Batched radio replies carry a random handle instead of the
+        # encrypted token so several clients share one packet
+        if compact:
+            token = os.urandom(auth_batch.TOKEN_FORMAT.size // 2).hex()
+        else:
+            token = await self.generate_token(session)
         self.tokens[token] = session_id
         
         return {
@@ -27,6 +219,141 @@ class ReticulumAuth:
             'expires_at': session['expires_at']
         }
         
+    async def handle_batch_requests(self, packets):
+        # Requests relayed by a gateway are not signed individually: key
+        # possession is proven by the challenge response, which keeps each
+        # entry small enough to pack several per LoRa packet
+        batch_nonce = os.urandom(16)
+        timestamp = int(time.time())
+        accepted = 0
+        
+        for packet in packets:
+            for entry in self.read_entries(packet, auth_batch.AUTH_BATCH_REQUEST):
+                try:
+                    request = auth_batch.decode_request(entry)
+                except (struct.error, ValueError):
+                    continue
+                if not self.check_timestamp(request['timestamp']):
+                    continue
+                known = self.identities.get(request['user_id'], request['public_key'])
+                if known != request['public_key']:
+                    continue
+                try:
+                    self.store_challenge(request['nonce'], {
+                        'user_id': request['user_id'],
+                        'scope': request['scope'],
+                        'public_key': request['public_key'],
+                        'challenge': auth_batch.response_payload(
+                            batch_nonce,
+                            request['nonce'],
+                            self.crypto.public_signing_key
+                        ),
+                        'expires_at': datetime.now() + self.challenge_lifetime
+                    }, batch=True)
+                    accepted += 1
+                except AuthenticationError:
+                    continue
+                    
+        # One challenge packet answers the whole batch
+        node_key = self.crypto.public_signing_key
+        signature = self.crypto.sign_data(
+            auth_batch.challenge_payload(batch_nonce, timestamp, node_key)
+        )
+        challenge = auth_batch.CHALLENGE_FORMAT.pack(
+            batch_nonce, timestamp, node_key, signature
+        )
+        return {
+            'accepted': accepted,
+            'packet': auth_batch.build_packet(auth_batch.AUTH_BATCH_CHALLENGE, [challenge])
+        }
+        
+    async def handle_batch_responses(self, packets, packet_size=250):
+        # Token entries have a fixed size, so a packet too small for one is
+        # refused before any challenge is consumed or session issued
+        auth_batch.check_fits(auth_batch.TOKEN_FORMAT.size, packet_size)
+        
+        pending = []
+        for packet in packets:
+            for entry in self.read_entries(packet, auth_batch.AUTH_BATCH_RESPONSE):
+                try:
+                    nonce, signature = auth_batch.RESPONSE_FORMAT.unpack(entry)
+                except struct.error:
+                    continue
+                challenge = self.batch_challenges.get(nonce)
+                if challenge and challenge['expires_at'] >= datetime.now():
+                    pending.append((nonce, challenge, signature))
+                    
+        valid = CryptoHandler.verify_batch([
+            (challenge['public_key'], challenge['challenge'], signature)
+            for _, challenge, signature in pending
+        ])
+        
+        entries = []
+        for (nonce, challenge, _), ok in zip(pending, valid):
+            # Only a verified answer consumes its challenge, and only once
+            if not ok or self.batch_challenges.pop(nonce, None) is None:
+                continue
+            if not self.bind_identity(challenge['user_id'], challenge['public_key']):
+                continue
+            result = await self.issue_session(
+                challenge['user_id'], challenge['scope'], compact=True
+            )
+            entries.append(auth_batch.TOKEN_FORMAT.pack(nonce, bytes.fromhex(result['token'])))
+            
+        return auth_batch.pack_entries(auth_batch.AUTH_BATCH_TOKEN, entries, packet_size)
+        
+    @staticmethod
+    def read_entries(packet, packet_type):
+        # A malformed radio packet is dropped without failing the batch
+        try:
+            return auth_batch.unpack_entries(packet, packet_type)
+        except (struct.error, ValueError):
+            return []
+            
+    @staticmethod
+    def create_batch_request(signing_key, user_id, scope):
+        if isinstance(scope, str):
+            scope = [scope]
+        nonce = os.urandom(16)
+        entry = auth_batch.encode_request(
+            bytes(signing_key.verify_key),
+            nonce,
+            int(time.time()),
+            user_id,
+            scope
+        )
+        return nonce, entry
+        
+    @staticmethod
+    def solve_batch_challenge(signing_key, nonce, challenge_packet, node_key=None):
+        (entry,) = auth_batch.unpack_entries(challenge_packet, auth_batch.AUTH_BATCH_CHALLENGE)
+        batch_nonce, timestamp, challenge_key, signature = auth_batch.CHALLENGE_FORMAT.unpack(entry)
+        
+        if node_key is not None and challenge_key != node_key:
+            raise AuthenticationError("AUTH001")
+        if not CryptoHandler.verify_signature(
+            challenge_key,
+            auth_batch.challenge_payload(batch_nonce, timestamp, challenge_key),
+            signature
+        ):
+            raise AuthenticationError("AUTH001")
+            
+        response = signing_key.sign(
+            auth_batch.response_payload(batch_nonce, nonce, challenge_key)
+        ).signature
+        return auth_batch.RESPONSE_FORMAT.pack(nonce, response)
+        
+    @staticmethod
+    def read_batch_tokens(packets):
+        tokens = {}
+        for packet in packets:
+            for entry in auth_batch.unpack_entries(packet, auth_batch.AUTH_BATCH_TOKEN):
+                if len(entry) != auth_batch.TOKEN_FORMAT.size:
+                    continue
+                nonce, handle = auth_batch.TOKEN_FORMAT.unpack(entry)
+                tokens[nonce] = handle.hex()
+        return tokens
+        
     async def generate_token(self, session):
         token_data = {
             'user_id': session['user_id'],
@@ -36,17 +363,39 @@ class ReticulumAuth:
         return self.crypto.encrypt_data(str(token_data))
         
     async def verify_token(self, token):
+        if self.cache.is_rate_limited(token, known=token in self.tokens):
+            metrics.inc('auth_token_checks_total', result='rate_limited')
+            return False
+            
+        cached = self.cache.get(token)
+        if cached is not None:
+            metrics.inc('auth_token_checks_total', result='cached')
+            return cached['result']
+            
         if token not in self.tokens:
+            metrics.inc('auth_token_checks_total', result='invalid')
+            self.cache.put(token, None, False)
             return False
         session_id = self.tokens[token]
         session = self.sessions.get(session_id)
         
         if not session:
+            metrics.inc('auth_token_checks_total', result='invalid')
+            self.cache.put(token, None, False)
             return False
             
         if session['expires_at'] < datetime.now():
-            del self.sessions[session_id]
-            del self.tokens[token]
+            metrics.inc('auth_token_checks_total', result='expired')
+            await self.revoke_token(token)
             return False
             
-        return session
\ No newline at end of file
+        metrics.inc('auth_token_checks_total', result='valid')
+        self.cache.put(token, None, session, expires_at=session['expires_at'])
+        return session
+        
+    async def revoke_token(self, token):
+        session_id = self.tokens.pop(token, None)
+        if session_id is not None:
+            self.sessions.pop(session_id, None)
+        self.cache.invalidate(token)
+        return session_id is not None
\ No newline at end of file
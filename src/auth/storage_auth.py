@@ -1,48 +1,212 @@
 from datetime import datetime, timedelta
+import asyncio
+import heapq
+import posixpath
 import uuid
+from ..utils.metrics import metrics
+from .verification_cache import VerificationCache
+
+class PermissionTrie:
+    def __init__(self):
+        self.root = {'children': {}, 'grants': {}}
+        
+    @staticmethod
+    def split_path(path):
+        # Dot segments would let a grant reach outside its subtree once the
+        # path is resolved on disk, so they are refused rather than resolved
+        if {'.', '..'} & set(path.split('/')):
+            raise ValueError(f"Relative segment in path {path!r}")
+        segments = [s for s in posixpath.normpath('/' + path).split('/') if s]
+        # A trailing slash grants the whole subtree under the path
+        recursive = path.endswith('/') or not segments
+        return segments, recursive
+        
+    def insert(self, path, permission_id):
+        segments, recursive = self.split_path(path)
+        node = self.root
+        for segment in segments:
+            node = node['children'].setdefault(
+                segment, {'children': {}, 'grants': {}}
+            )
+        node['grants'][permission_id] = recursive
+        
+    def remove(self, path, permission_id):
+        try:
+            segments, _ = self.split_path(path)
+        except ValueError:
+            return
+        node = self.root
+        trail = []
+        for segment in segments:
+            child = node['children'].get(segment)
+            if child is None:
+                return
+            trail.append((node, segment))
+            node = child
+        node['grants'].pop(permission_id, None)
+        
+        # Prune branches that no longer carry any grants
+        for parent, segment in reversed(trail):
+            child = parent['children'][segment]
+            if child['grants'] or child['children']:
+                break
+            del parent['children'][segment]
+            
+    def match(self, path, permission_id):
+        try:
+            segments, _ = self.split_path(path)
+        except ValueError:
+            return False
+        node = self.root
+        for segment in segments:
+            if node['grants'].get(permission_id):
+                return True
+            node = node['children'].get(segment)
+            if node is None:
+                return False
+        return permission_id in node['grants']
 
 class StorageAuth:
     def __init__(self):
         self.permissions = {}
         self.access_tokens = {}
+        self.trie = PermissionTrie()
+        self.expiry_heap = []
+        self.permission_lifetime = timedelta(hours=1)
+        self.cache = VerificationCache()
         
     async def authorize_access(self, user_id, path, mode='read'):
+        return await self.authorize_batch(user_id, [path], mode)
+        
+    async def authorize_batch(self, user_id, paths, mode='read'):
+        paths = list(paths)
+        # Reject bad paths before any part of the grant is recorded
+        for path in paths:
+            self.trie.split_path(path)
+            
         permission_id = str(uuid.uuid4())
         permission = {
             'user_id': user_id,
-            'path': path,
+            'paths': paths,
             'mode': mode,
             'created_at': datetime.now(),
-            'expires_at': datetime.now() + timedelta(hours=1)
+            'expires_at': datetime.now() + self.permission_lifetime
         }
         
         self.permissions[permission_id] = permission
+        for path in permission['paths']:
+            self.trie.insert(path, permission_id)
+            
         token = await self.generate_access_token(permission)
         self.access_tokens[token] = permission_id
+        heapq.heappush(
+            self.expiry_heap,
+            (permission['expires_at'], permission_id, token)
+        )
         
         return {
             'token': token,
             'expires_at': permission['expires_at']
         }
         
+    async def authorize_manifest(self, user_id, manifest, mode='read'):
+        # One token for the manifest and every page and resource it lists
+        paths = [f"/sites/{manifest['site_id']}/"]
+        for section in ('pages', 'resources'):
+            for entry in manifest.get(section, {}).values():
+                paths.append(entry['storage_path'])
+                
+        return await self.authorize_batch(user_id, paths, mode)
+        
     async def generate_access_token(self, permission):
         return str(uuid.uuid4())  # In practice, use secure token generation
         
-    async def validate_access(self, token, path, mode):
-        if token not in self.access_tokens:
-            return False
+    def lookup_permission(self, token):
+        permission_id = self.access_tokens.get(token)
+        if permission_id is None:
+            return None, None
             
-        permission_id = self.access_tokens[token]
         permission = self.permissions.get(permission_id)
+        if not permission:
+            return None, None
+            
+        if permission['expires_at'] < datetime.now():
+            self.revoke_permission(permission_id, token)
+            return None, None
+            
+        return permission_id, permission
         
+    def check_mode(self, permission, mode):
+        return (permission['mode'] in ['write', 'read'] and
+                (mode == 'read' or permission['mode'] == 'write'))
+                
+    async def validate_access(self, token, path, mode):
+        if self.cache.is_rate_limited(token, known=token in self.access_tokens):
+            metrics.inc('auth_access_checks_total', result='rate_limited')
+            return False
+            
+        cached = self.cache.get(token, (path, mode))
+        if cached is not None:
+            metrics.inc('auth_access_checks_total', result='cached')
+            return cached['result']
+            
+        permission_id, permission = self.lookup_permission(token)
         if not permission:
+            metrics.inc('auth_access_checks_total', result='denied')
+            self.cache.put(token, (path, mode), False)
             return False
             
-        if permission['expires_at'] < datetime.now():
-            del self.permissions[permission_id]
-            del self.access_tokens[token]
+        result = (self.check_mode(permission, mode) and
+                  self.trie.match(path, permission_id))
+        metrics.inc('auth_access_checks_total', result='allowed' if result else 'denied')
+        self.cache.put(
+            token,
+            (path, mode),
+            result,
+            expires_at=permission['expires_at'],
+            penalize=False
+        )
+        return result
+        
+    async def validate_batch(self, token, paths, mode):
+        permission_id, permission = self.lookup_permission(token)
+        if not permission or not self.check_mode(permission, mode):
+            return {path: False for path in paths}
+            
+        return {
+            path: self.trie.match(path, permission_id)
+            for path in paths
+        }
+        
+    async def revoke_access(self, token):
+        permission_id = self.access_tokens.get(token)
+        if permission_id is None:
             return False
             
-        return (permission['path'] == path and 
-                permission['mode'] in ['write', 'read'] and
-                (mode == 'read' or permission['mode'] == 'write'))
\ No newline at end of file
+        self.revoke_permission(permission_id, token)
+        return True
+        
+    def revoke_permission(self, permission_id, token):
+        permission = self.permissions.pop(permission_id, None)
+        if permission:
+            for path in permission['paths']:
+                self.trie.remove(path, permission_id)
+        self.access_tokens.pop(token, None)
+        self.cache.invalidate(token)
+        
+    def expire_permissions(self, now=None):
+        now = now or datetime.now()
+        expired = 0
+        
+        while self.expiry_heap and self.expiry_heap[0][0] < now:
+            _, permission_id, token = heapq.heappop(self.expiry_heap)
+            if permission_id in self.permissions:
+                self.revoke_permission(permission_id, token)
+                expired += 1
+                
+        return expired
+        
+    async def run_expiry(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            self.expire_permissions()
\ No newline at end of file
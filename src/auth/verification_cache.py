@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from datetime import datetime
+import time
+
+class VerificationCache:
+    def __init__(self, max_entries=4096, ttl=300, negative_ttl=30,
+                 failure_limit=5, failure_window=60, max_negative_entries=512,
+                 global_failure_limit=256):
+        self.entries = OrderedDict()
+        # Denials get their own, smaller LRU so a flood of distinct forged
+        # tokens cannot push valid ones out of the cache
+        self.negative = OrderedDict()
+        self.token_keys = {}
+        self.failures = {}
+        self.global_failures = (0.0, 0)
+        self.max_entries = max_entries
+        self.max_negative_entries = max_negative_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.failure_limit = failure_limit
+        self.failure_window = failure_window
+        self.global_failure_limit = global_failure_limit
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'negative_hits': 0,
+            'rate_limited': 0
+        }
+        
+    def get(self, token, scope=None):
+        key = (token, scope)
+        table = self.entries if key in self.entries else self.negative
+        entry = table.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+            
+        if entry['expires'] <= time.monotonic():
+            self.discard(key)
+            self.stats['misses'] += 1
+            return None
+            
+        table.move_to_end(key)
+        if entry['result'] is False:
+            # Replays of a known-bad token still count toward its limit
+            if entry['penalize']:
+                self.record_failure(token, time.monotonic())
+            self.stats['negative_hits'] += 1
+        else:
+            self.stats['hits'] += 1
+        return entry
+        
+    def put(self, token, scope, result, expires_at=None, penalize=True):
+        now = time.monotonic()
+        if result is False:
+            ttl = self.negative_ttl
+            # Only unknown or forged tokens count toward rate limiting,
+            # not valid tokens used outside their scope
+            if penalize:
+                self.record_failure(token, now)
+        else:
+            ttl = self.ttl
+            
+        # Never trust a cached result past the token's own expiry
+        if expires_at is not None:
+            remaining = (expires_at - datetime.now()).total_seconds()
+            ttl = min(ttl, remaining)
+        if ttl <= 0:
+            return
+            
+        key = (token, scope)
+        self.discard(key)
+        if result is False:
+            table, limit = self.negative, self.max_negative_entries
+        else:
+            table, limit = self.entries, self.max_entries
+        table[key] = {
+            'result': result,
+            'expires': now + ttl,
+            'penalize': result is False and penalize
+        }
+        self.token_keys.setdefault(token, set()).add(key)
+        
+        while len(table) > limit:
+            oldest = next(iter(table))
+            self.discard(oldest)
+            
+    def record_failure(self, token, now):
+        # Failures also count toward a limit shared by all tokens
+        window_start, count = self.global_failures
+        if now - window_start > self.failure_window:
+            window_start, count = now, 0
+        self.global_failures = (window_start, count + 1)
+        
+        window_start, count = self.failures.get(token, (now, 0))
+        if now - window_start > self.failure_window:
+            window_start, count = now, 0
+        self.failures[token] = (window_start, count + 1)
+        
+        # Keep the failure table bounded alongside the result cache
+        if len(self.failures) > self.max_entries:
+            stale = [
+                t for t, (start, _) in self.failures.items()
+                if now - start > self.failure_window
+            ]
+            for t in stale or list(self.failures)[:len(self.failures) // 2]:
+                del self.failures[t]
+                
+    def is_rate_limited(self, token, known=False):
+        # known: the caller holds the token (a cheap dict lookup), so the
+        # shared limit only throttles tokens that would need a full check
+        now = time.monotonic()
+        record = self.failures.get(token)
+        if record:
+            window_start, count = record
+            if now - window_start > self.failure_window:
+                del self.failures[token]
+            elif count >= self.failure_limit:
+                self.stats['rate_limited'] += 1
+                return True
+                
+        # While failures across all tokens exceed their limit, unknown
+        # tokens are refused before any lookup or caching
+        if self.flooded(now) and not known and not self.trusted(token):
+            self.stats['rate_limited'] += 1
+            return True
+        return False
+        
+    def flooded(self, now):
+        window_start, count = self.global_failures
+        return now - window_start <= self.failure_window and count >= self.global_failure_limit
+        
+    def trusted(self, token):
+        return any(key in self.entries for key in self.token_keys.get(token, ()))
+        
+    def discard(self, key):
+        self.entries.pop(key, None)
+        self.negative.pop(key, None)
+        keys = self.token_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.token_keys[key[0]]
+                
+    def invalidate(self, token):
+        for key in self.token_keys.pop(token, set()):
+            self.entries.pop(key, None)
+            self.negative.pop(key, None)
+            
+    def clear(self):
+        self.entries.clear()
+        self.negative.clear()
+        self.token_keys.clear()
+        self.failures.clear()
+        self.global_failures = (0.0, 0)
\ No newline at end of file
@@ -1,11 +1,19 @@
 import asyncio
+import logging
+import time
 from datetime import datetime
+from ..utils import delta, streams
+from ..utils.metrics import metrics
+from .peer_cache import PeerContentCache
+
+logger = logging.getLogger(__name__)
 
 class DistributedStorageManager:
     def __init__(self):
         self.peers = {}
         self.content_index = {}
         self.replication_factor = 3
+        self.cache = PeerContentCache()
         
     async def store_distributed(self, key, data, options=None):
         options = options or {}
@@ -22,7 +30,8 @@ class DistributedStorageManager:
                 result = await self.store_on_peer(peer, key, data)
                 results.append(result)
             except Exception as e:
-                print(f"Failed to store on peer {peer}: {e}")
+                logger.warning("Failed to store on peer %s: %s", peer.id, e)
+                metrics.inc('storage_peer_errors_total', op='store', peer=peer.id)
                 
         # Update content index
         self.content_index[key] = {
@@ -37,7 +46,13 @@ class DistributedStorageManager:
             'peers': [p.id for p in peers]
         }
         
-    async def retrieve_distributed(self, key):
+    async def retrieve_distributed(self, key, content_id=None):
+        # Content-addressed objects can come from any verified copy
+        if content_id:
+            data = await self.retrieve_cached(content_id)
+            if data is not None:
+                return data
+                
         if key not in self.content_index:
             raise KeyError(f"Content {key} not found")
             
@@ -48,9 +63,227 @@ class DistributedStorageManager:
             try:
                 peer = self.peers.get(peer_id)
                 if peer:
+                    started = time.perf_counter()
                     data = await self.retrieve_from_peer(peer, key)
+                    metrics.observe(
+                        'storage_peer_read_seconds',
+                        time.perf_counter() - started,
+                        peer=peer_id
+                    )
+                    if content_id:
+                        self.cache.admit(content_id, data)
                     return data
             except Exception as e:
+                logger.debug("Failed to read %s from peer %s: %s", key, peer_id, e)
+                metrics.inc('storage_peer_errors_total', op='read', peer=peer_id)
+                continue
+                
+        raise Exception(f"Failed to retrieve {key} from any peer")
+        
+    async def store_stream(self, key, chunks, options=None):
+        # Streamed counterpart of store_distributed: each chunk is fanned
+        # out to every replica as it arrives; a bounded queue per replica
+        # caps memory at window chunks however large the object is
+        options = options or {}
+        peers = await self.find_storage_peers(
+            count=options.get('replication_factor', self.replication_factor)
+        )
+        window = options.get('window', 4)
+        queues = [asyncio.Queue(maxsize=window) for _ in peers]
+        
+        async def replicate(peer, queue):
+            finished = False
+            
+            async def peer_chunks():
+                nonlocal finished
+                while True:
+                    chunk = await queue.get()
+                    if chunk is None:
+                        finished = True
+                        return
+                    yield chunk
+                    
+            async def drain():
+                # A replica that stops early keeps draining its queue so
+                # the others are not stalled
+                nonlocal finished
+                while not finished:
+                    finished = await queue.get() is None
+                    
+            try:
+                result = await self.store_stream_on_peer(peer, key, peer_chunks())
+            except Exception:
+                await drain()
+                raise
+            await drain()
+            return result
+            
+        tasks = [
+            asyncio.create_task(replicate(peer, queue))
+            for peer, queue in zip(peers, queues)
+        ]
+        size = 0
+        try:
+            async for chunk in streams.rechunk(chunks, options.get('chunk_size', streams.CHUNK_SIZE)):
+                size += len(chunk)
+                for queue in queues:
+                    await queue.put(chunk)
+        except BaseException:
+            # Never let replicas commit a truncated object
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+            
+        for queue in queues:
+            await queue.put(None)
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        results = []
+        for peer, outcome in zip(peers, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning("Failed to store on peer %s: %s", peer.id, outcome)
+                metrics.inc('storage_peer_errors_total', op='store', peer=peer.id)
+            else:
+                results.append(outcome)
+                
+        self.content_index[key] = {
+            'peers': [p.id for p in peers],
+            'timestamp': datetime.now().isoformat(),
+            'size': size
+        }
+        
+        return {
+            'key': key,
+            'stored_copies': len(results),
+            'peers': [p.id for p in peers]
+        }
+        
+    async def retrieve_stream(self, key):
+        # Streamed counterpart of retrieve_distributed; if a replica fails
+        # mid-stream the next one resumes from the bytes already yielded
+        if key not in self.content_index:
+            raise KeyError(f"Content {key} not found")
+            
+        offset = 0
+        for peer_id in self.content_index[key]['peers']:
+            peer = self.peers.get(peer_id)
+            if not peer:
+                continue
+            try:
+                async for chunk in self.retrieve_stream_from_peer(peer, key, offset):
+                    offset += len(chunk)
+                    yield chunk
+                return
+            except Exception as e:
+                logger.debug("Failed to stream %s from peer %s at %d: %s", key, peer_id, offset, e)
+                metrics.inc('storage_peer_errors_total', op='read', peer=peer_id)
+                
+        raise Exception(f"Failed to retrieve {key} from any peer")
+        
+    async def retrieve_delta(self, key, base):
+        # Fetch a newer version of an object we hold an older copy of by
+        # sending block signatures and receiving only the differences
+        if key not in self.content_index:
+            raise KeyError(f"Content {key} not found")
+            
+        encoded = delta.encode_signature(delta.signature(base))
+        for peer_id in self.content_index[key]['peers']:
+            peer = self.peers.get(peer_id)
+            if not peer:
+                continue
+            try:
+                message = await self.retrieve_delta_from_peer(peer, key, encoded)
+                data = delta.apply_update(base, message)
+            except Exception as e:
+                logger.debug("Delta read of %s from peer %s failed: %s", key, peer_id, e)
+                metrics.inc('storage_peer_errors_total', op='delta', peer=peer_id)
+                continue
+                
+            sent = len(encoded) + delta.update_size(message)
+            metrics.inc('storage_delta_bytes_saved_total', max(len(data) - sent, 0))
+            return data
+            
+        # No replica could answer with a delta
+        return await self.retrieve_distributed(key)
+        
+    def serve_delta(self, data, encoded_signature):
+        # Answer a peer's retrieve_delta from the version held here
+        return delta.make_update(delta.decode_signature(encoded_signature), data)
+        
+    async def update_distributed(self, key, data, base):
+        # Push a new version to replicas holding base as a delta
+        entry = self.content_index.get(key)
+        if not entry:
+            return await self.store_distributed(key, data)
+            
+        message = delta.make_update(delta.signature(base), data)
+        results = []
+        for peer_id in entry['peers']:
+            peer = self.peers.get(peer_id)
+            if not peer:
+                continue
+            try:
+                results.append(await self.update_on_peer(peer, key, message))
+            except Exception as e:
+                # The replica may hold another version; send it whole
+                logger.debug("Delta update of %s on peer %s failed: %s", key, peer_id, e)
+                try:
+                    results.append(await self.store_on_peer(peer, key, data))
+                except Exception as e:
+                    logger.warning("Failed to store on peer %s: %s", peer_id, e)
+                    metrics.inc('storage_peer_errors_total', op='store', peer=peer_id)
+                    
+        entry.update({
+            'timestamp': datetime.now().isoformat(),
+            'size': len(data)
+        })
+        
+        return {
+            'key': key,
+            'stored_copies': len(results),
+            'mode': message['type'],
+            'bytes': delta.update_size(message)
+        }
+        
+    def apply_update(self, base, message):
+        # Replica side of update_distributed
+        return delta.apply_update(base, message)
+        
+    async def retrieve_cached(self, content_id):
+        data = self.cache.get(content_id)
+        metrics.inc('peer_cache_requests_total', result='miss' if data is None else 'hit')
+        if data is not None:
+            return data
+            
+        # Nearest advertising peers first
+        providers = [
+            self.peers[peer_id] for peer_id in self.cache.find_providers(content_id)
+            if peer_id in self.peers
+        ]
+        providers.sort(key=lambda peer: getattr(peer, 'hops', 1))
+        
+        for peer in providers:
+            try:
+                data = await self.retrieve_from_peer(peer, content_id)
+            except Exception:
+                self.cache.forget_provider(content_id, peer.id)
                 continue
                 
-        raise Exception(f"Failed to retrieve {key} from any peer")
\ No newline at end of file
+            # Never pass on a copy that does not match its content id
+            if self.cache.verify(content_id, data):
+                self.cache.admit(content_id, data)
+                return data
+            self.cache.forget_provider(content_id, peer.id)
+            
+        return None
+        
+    async def serve_cached(self, content_id):
+        # Answer a neighbor's request from the local cache
+        return self.cache.get(content_id)
+        
+    def cache_advertisement(self, node_id):
+        return self.cache.advertisement(node_id)
+        
+    async def handle_cache_advert(self, advert):
+        self.cache.observe_advertisement(advert)
\ No newline at end of file
@@ -0,0 +1,139 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from ..utils.crypto import CryptoHandler
+
+class PeerContentCache:
+    def __init__(self, max_bytes=16 * 1024 * 1024, half_life=3600,
+                 advert_size=64, provider_ttl=1800):
+        self.entries = OrderedDict()
+        self.popularity = {}
+        self.providers = {}
+        self.max_bytes = max_bytes
+        self.half_life = half_life
+        self.advert_size = advert_size
+        self.provider_ttl = provider_ttl
+        self.size = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'admitted': 0,
+            'rejected': 0,
+            'evicted': 0,
+            'verify_failures': 0
+        }
+        
+    def score(self, content_id, now=None):
+        # Request count with exponential decay
+        record = self.popularity.get(content_id)
+        if not record:
+            return 0.0
+        value, updated = record
+        elapsed = (now or time.monotonic()) - updated
+        return value * 0.5 ** (elapsed / self.half_life)
+        
+    def record_request(self, content_id):
+        now = time.monotonic()
+        self.popularity[content_id] = (self.score(content_id, now) + 1.0, now)
+        
+        # Forget demand for objects that have gone cold
+        if len(self.popularity) > 8 * max(len(self.entries), 1024):
+            cold = [
+                cid for cid in self.popularity
+                if cid not in self.entries and self.score(cid, now) < 0.5
+            ]
+            for cid in cold:
+                del self.popularity[cid]
+                
+    def get(self, content_id):
+        self.record_request(content_id)
+        entry = self.entries.get(content_id)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+            
+        self.entries.move_to_end(content_id)
+        self.stats['hits'] += 1
+        return entry['data']
+        
+    def contains(self, content_id):
+        return content_id in self.entries
+        
+    def verify(self, content_id, data):
+        return CryptoHandler.content_id(data) == content_id
+        
+    def admit(self, content_id, data):
+        # Cache a fetched object if it verifies and is popular enough
+        if not self.verify(content_id, data):
+            self.stats['verify_failures'] += 1
+            return False
+        if content_id in self.entries:
+            return True
+            
+        size = len(data)
+        if size > self.max_bytes:
+            self.stats['rejected'] += 1
+            return False
+            
+        # Evict the least popular objects, but only for a more popular one
+        now = time.monotonic()
+        candidate = self.score(content_id, now)
+        victims = []
+        freed = self.max_bytes - self.size
+        if freed < size:
+            for cid in sorted(self.entries, key=lambda cid: self.score(cid, now)):
+                if self.score(cid, now) >= candidate:
+                    break
+                victims.append(cid)
+                freed += self.entries[cid]['size']
+                if freed >= size:
+                    break
+            if freed < size:
+                self.stats['rejected'] += 1
+                return False
+                
+        for cid in victims:
+            self.evict(cid)
+            
+        self.entries[content_id] = {
+            'data': data,
+            'size': size,
+            'stored_at': datetime.now()
+        }
+        self.size += size
+        self.stats['admitted'] += 1
+        return True
+        
+    def evict(self, content_id):
+        entry = self.entries.pop(content_id, None)
+        if entry:
+            self.size -= entry['size']
+            self.stats['evicted'] += 1
+            
+    def advertisement(self, node_id):
+        # Most popular cached content ids, for gossip to neighbors
+        now = time.monotonic()
+        top = sorted(self.entries, key=lambda cid: self.score(cid, now), reverse=True)
+        return {
+            'type': 'cache_advert',
+            'node': node_id,
+            'content_ids': top[:self.advert_size],
+            'timestamp': datetime.now().isoformat()
+        }
+        
+    def observe_advertisement(self, advert):
+        expires = time.monotonic() + self.provider_ttl
+        for content_id in advert.get('content_ids', []):
+            self.providers.setdefault(content_id, {})[advert['node']] = expires
+            
+    def forget_provider(self, content_id, peer_id):
+        self.providers.get(content_id, {}).pop(peer_id, None)
+        
+    def find_providers(self, content_id):
+        now = time.monotonic()
+        providers = self.providers.get(content_id, {})
+        for peer_id in [p for p, expires in providers.items() if expires <= now]:
+            del providers[peer_id]
+        if not providers:
+            self.providers.pop(content_id, None)
+        return list(providers)
\ No newline at end of file
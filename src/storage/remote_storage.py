@@ -1,15 +1,22 @@
 import os
 import json
+import asyncio
+import hashlib
+import zlib
 from datetime import datetime
-from ..utils.crypto import CryptoHandler
+from ..utils.crypto import CryptoHandler, STREAM_HEADER
+from ..utils import streams
+from ..utils.metrics import metrics
 from ..utils.sync import SyncManager
 
 class RemoteStorageSystem:
     def __init__(self):
         self.crypto = CryptoHandler()
-        self.sync = SyncManager()
+        # Deltas go out once a peer transport is set as sync.send_update
+        self.sync = SyncManager(load_data=self.load_for_sync)
         self.storage_path = "/var/mesh/storage"  # Default path
         
+    @metrics.timed('storage_store')
     async def store_data(self, path, data, options=None):
         options = options or {}
         
@@ -17,32 +24,152 @@ class RemoteStorageSystem:
         if options.get('encrypt', True):
             data = self.crypto.encrypt_data(data)
             
-        # Generate storage path
-        storage_path = os.path.join(
+        # Store data and metadata
+        metadata = self.write_object(path, data, {
+            'encrypted': options.get('encrypt', True),
+            'version': options.get('version', 1)
+        })
+        
+        # Queue for sync if needed
+        if options.get('sync', True):
+            await self.sync.queue_sync({
+                'id': path,
+                'type': 'store',
+                'timestamp': metadata['created_at']
+            })
+            
+        return {
+            'path': path,
+            'metadata': metadata
+        }
+        
+    @metrics.timed('storage_store_batch')
+    async def store_batch(self, records, options=None):
+        # Records arrive already prepared (hashed, compressed, encrypted);
+        # the whole batch is written off the event loop in one call
+        options = options or {}
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(None, self.write_batch, records)
+        
+        if options.get('sync', True):
+            for result in results:
+                await self.sync.queue_sync({
+                    'id': result['path'],
+                    'type': 'store',
+                    'timestamp': result['metadata']['created_at']
+                })
+                
+        return results
+        
+    def write_batch(self, records):
+        results = []
+        for record in records:
+            metadata = self.write_object(record['path'], record['data'], {
+                'encrypted': record.get('encrypted', False),
+                'compressed': record.get('compressed', False),
+                'content_id': record.get('content_id'),
+                'size': record.get('size'),
+                'version': record.get('version', 1)
+            })
+            results.append({
+                'path': record['path'],
+                'metadata': metadata
+            })
+        return results
+        
+    def object_path(self, path):
+        return os.path.join(
             self.storage_path,
             path.lstrip('/')
         )
         
+    def write_object(self, path, data, fields):
+        storage_path = self.object_path(path)
+        
         # Ensure directory exists
         os.makedirs(os.path.dirname(storage_path), exist_ok=True)
         
-        # Store data
         with open(storage_path, 'wb') as f:
             f.write(data)
-            
-        # Store metadata
+        metrics.inc('storage_bytes_written_total', len(data))
+        
+        return self.write_metadata(path, fields)
+        
+    def write_metadata(self, path, fields):
         metadata = {
             'path': path,
-            'created_at': datetime.now().isoformat(),
-            'encrypted': options.get('encrypt', True),
-            'version': options.get('version', 1)
+            'created_at': datetime.now().isoformat()
         }
+        metadata.update(fields)
         
-        metadata_path = f"{storage_path}.meta"
+        metadata_path = f"{self.object_path(path)}.meta"
         with open(metadata_path, 'w') as f:
             json.dump(metadata, f)
             
-        # Queue for sync if needed
+        return metadata
+        
+    def read_metadata(self, path):
+        storage_path = self.object_path(path)
+        if not os.path.exists(storage_path):
+            raise FileNotFoundError(f"No data found at {path}")
+            
+        with open(f"{storage_path}.meta", 'r') as f:
+            return json.load(f)
+            
+    @metrics.timed('storage_store_stream')
+    async def store_stream(self, path, chunks, options=None):
+        # Streamed counterpart of store_data: chunks are hashed, encrypted
+        # and written one at a time, so memory stays at a few chunks
+        options = options or {}
+        encrypt = options.get('encrypt', True)
+        chunk_size = options.get('chunk_size', streams.CHUNK_SIZE)
+        storage_path = self.object_path(path)
+        os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+        
+        digest = hashlib.sha256()
+        size = 0
+        
+        async def plaintext():
+            nonlocal size
+            async for chunk in streams.rechunk(chunks, chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+                yield chunk
+                
+        # Encrypted objects are stored as length-prefixed tokens, each bound
+        # to this object by a random stream id kept in the metadata
+        stream_id = os.urandom(16)
+        if encrypt:
+            tokens = self.crypto.encrypt_stream(plaintext(), stream_id)
+            records = (streams.frame(token) async for token in tokens)
+        else:
+            records = plaintext()
+            
+        # Write beside the object and rename, so readers never see a
+        # partial object and a failed stream leaves the old version
+        loop = asyncio.get_running_loop()
+        temp_path = f"{storage_path}.part"
+        try:
+            with open(temp_path, 'wb') as f:
+                async for record in records:
+                    await loop.run_in_executor(None, f.write, record)
+                    metrics.inc('storage_bytes_written_total', len(record))
+            os.replace(temp_path, storage_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+            
+        metadata = self.write_metadata(path, {
+            'encrypted': encrypt,
+            'chunked': encrypt,
+            'chunk_size': chunk_size,
+            'stream_id': stream_id.hex() if encrypt else None,
+            'content_id': digest.hexdigest()[:16],
+            'size': size,
+            'version': options.get('version', 1)
+        })
+        
         if options.get('sync', True):
             await self.sync.queue_sync({
                 'id': path,
@@ -55,28 +182,74 @@ class RemoteStorageSystem:
             'metadata': metadata
         }
         
-    async def retrieve_data(self, path):
-        storage_path = os.path.join(
-            self.storage_path,
-            path.lstrip('/')
-        )
+    async def retrieve_stream(self, path, chunk_size=None):
+        # Streamed counterpart of retrieve_data; yields plaintext chunks
+        metadata = self.read_metadata(path)
+        storage_path = self.object_path(path)
+        chunk_size = chunk_size or metadata.get('chunk_size') or streams.CHUNK_SIZE
         
-        if not os.path.exists(storage_path):
-            raise FileNotFoundError(f"No data found at {path}")
+        if metadata.get('chunked'):
+            # A token is never larger than its encrypted chunk
+            limit = self.crypto.encrypted_size(metadata['chunk_size'] + STREAM_HEADER.size)
+            chunks = self.crypto.decrypt_stream(
+                streams.read_frames(storage_path, limit),
+                bytes.fromhex(metadata['stream_id'])
+            )
+        elif metadata.get('encrypted', True):
+            # Objects stored by store_data are one token and decrypt whole
+            with open(storage_path, 'rb') as f:
+                data = self.crypto.decrypt_data(f.read())
+            chunks = streams.rechunk(data, chunk_size)
+        else:
+            chunks = streams.read_file(storage_path, chunk_size)
             
-        # Read metadata
-        metadata_path = f"{storage_path}.meta"
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
+        decompressor = zlib.decompressobj() if metadata.get('compressed') else None
+        digest = hashlib.sha256()
+        async for chunk in chunks:
+            metrics.inc('storage_bytes_read_total', len(chunk))
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            if chunk:
+                digest.update(chunk)
+                yield chunk
+        if decompressor:
+            tail = decompressor.flush()
+            if tail:
+                digest.update(tail)
+                yield tail
+                
+        # Streamed objects also check the whole against their content id
+        if metadata.get('chunked') and digest.hexdigest()[:16] != metadata['content_id']:
+            raise streams.StreamError(f"{path} does not match its content id")
+            
+    async def load_for_sync(self, path):
+        # Streamed objects are too large to diff in memory; they are
+        # synced by reference only
+        if self.read_metadata(path).get('chunked'):
+            return None
+        return (await self.retrieve_data(path))['data']
+        
+    @metrics.timed('storage_retrieve')
+    async def retrieve_data(self, path):
+        metadata = self.read_metadata(path)
+        if metadata.get('chunked'):
+            return {
+                'data': await streams.collect(self.retrieve_stream(path)),
+                'metadata': metadata
+            }
             
         # Read data
-        with open(storage_path, 'rb') as f:
+        with open(self.object_path(path), 'rb') as f:
             data = f.read()
-            
+        metrics.inc('storage_bytes_read_total', len(data))
+        
         # Decrypt if needed
         if metadata.get('encrypted', True):
             data = self.crypto.decrypt_data(data)
             
+        if metadata.get('compressed'):
+            data = zlib.decompress(data)
+            
         return {
             'data': data,
             'metadata': metadata
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import heapq
+import logging
+import math
+import os
+import random
+import time
+from datetime import datetime
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class TrickleTimer:
+    def __init__(self, imin=5, imax=1800, redundancy=2):
+        self.imin = imin
+        self.imax = imax
+        self.redundancy = redundancy
+        self.interval = imin
+        self.counter = 0
+        
+    def begin_interval(self):
+        #\"\"\"Start a new interval and pick its transmission point\"\"\"
+        self.counter = 0
+        return random.uniform(self.interval / 2, self.interval)
+        
+    def heard_consistent(self):
+        self.counter += 1
+        
+    def should_transmit(self):
+        # Stay quiet if enough neighbors already said the same thing
+        return self.counter < self.redundancy
+        
+    def expire_interval(self):
+        self.interval = min(self.interval * 2, self.imax)
+        
+    def reset(self):
+        #\"\"\"Neighborhood changed: fall back to the fastest rate\"\"\"
+        if self.interval == self.imin:
+            return False
+        self.interval = self.imin
+        return True
+
+class BloomFilter:
+    def __init__(self, capacity=2048, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        
+    def positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+        
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position // 8] |= 1 << (position % 8)
+        self.count += 1
+        
+    def __contains__(self, key):
+        return all(
+            self.bits[position // 8] & (1 << (position % 8))
+            for position in self.positions(key)
+        )
+
+class RotatingBloomFilter:
+    def __init__(self, capacity=2048, error_rate=0.01, window=600):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.window = window
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous = BloomFilter(capacity, error_rate)
+        self.rotated_at = time.monotonic()
+        
+    def rotate_if_needed(self):
+        if (time.monotonic() - self.rotated_at > self.window or
+                self.current.count >= self.capacity):
+            self.previous = self.current
+            self.current = BloomFilter(self.capacity, self.error_rate)
+            self.rotated_at = time.monotonic()
+            
+    def check_and_add(self, key):
+        #\"\"\"Return True if the key was already seen\"\"\"
+        self.rotate_if_needed()
+        if key in self.current or key in self.previous:
+            return True
+        self.current.add(key)
+        return False
+
+class PeerDiscovery:
+    def __init__(self, node_id, send_announce, peer_ttl=None,
+                 imin=5, imax=1800, redundancy=2):
+        self.node_id = node_id
+        self.send_announce = send_announce
+        # Several maximum intervals, so a suppressed node is not expired
+        # between two of its own refreshes
+        self.peer_ttl = peer_ttl if peer_ttl is not None else 6 * imax
+        self.trickle = TrickleTimer(imin, imax, redundancy)
+        self.seen = RotatingBloomFilter(window=imax)
+        self.peers = {}
+        self.expiry_index = []
+        self.sequence = 0
+        # Sequence numbers restart on reboot; the boot id keeps a restarted
+        # node's announces from being dropped as duplicates
+        self.boot_id = os.urandom(4).hex()
+        self.last_announced = None
+        self.reset_event = asyncio.Event()
+        self.stats = {
+            'announces_sent': 0,
+            'announces_suppressed': 0,
+            'duplicates_dropped': 0,
+            'peers_expired': 0
+        }
+        
+    def build_announcement(self):
+        self.sequence += 1
+        return {
+            'type': 'peer_discovery',
+            'node': self.node_id,
+            'seq': self.sequence,
+            'boot': self.boot_id,
+            'peers': len(self.peers),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+    def observe(self, announcement):
+        #\"\"\"Record a received announce; returns (peer, is_new) or None for duplicates\"\"\"
+        peer_id = announcement['node']
+        if peer_id == self.node_id:
+            return None
+            
+        if self.seen.check_and_add(f"{peer_id}:{announcement.get('boot')}:{announcement.get('seq')}"):
+            self.stats['duplicates_dropped'] += 1
+            return None
+            
+        expires = time.monotonic() + self.peer_ttl
+        is_new = peer_id not in self.peers
+        peer = self.peers.setdefault(peer_id, {'id': peer_id, 'first_seen': datetime.now()})
+        peer.update({
+            'last_seen': datetime.now(),
+            'expires': expires,
+            'announcement': announcement
+        })
+        heapq.heappush(self.expiry_index, (expires, peer_id))
+        
+        if is_new:
+            self.neighborhood_changed()
+        else:
+            self.trickle.heard_consistent()
+        return peer, is_new
+        
+    def refresh_due(self):
+        # Trickle suppression never starves our own liveness: announce at
+        # least every third of the TTL, so gaps stay within TTL/3 + 2 * imax
+        if self.last_announced is None:
+            return True
+        return time.monotonic() - self.last_announced >= self.peer_ttl / 3
+        
+    def neighborhood_changed(self):
+        if self.trickle.reset():
+            self.reset_event.set()
+            
+    def expire_peers(self):
+        #\"\"\"Drop peers whose last announce is older than the TTL\"\"\"
+        now = time.monotonic()
+        expired = []
+        while self.expiry_index and self.expiry_index[0][0] <= now:
+            expires, peer_id = heapq.heappop(self.expiry_index)
+            peer = self.peers.get(peer_id)
+            # Skip index entries superseded by a newer announce
+            if peer and peer['expires'] == expires:
+                del self.peers[peer_id]
+                expired.append(peer_id)
+                
+        if expired:
+            self.stats['peers_expired'] += len(expired)
+            self.neighborhood_changed()
+        return expired
+        
+    async def wait(self, delay):
+        #\"\"\"Sleep for delay seconds; returns True if a reset cut it short\"\"\"
+        try:
+            await asyncio.wait_for(self.reset_event.wait(), timeout=max(delay, 0))
+        except asyncio.TimeoutError:
+            return False
+        self.reset_event.clear()
+        return True
+        
+    async def run(self, on_expired=None):
+        #\"\"\"Trickle-driven announce loop\"\"\"
+        while True:
+            interval = self.trickle.interval
+            send_at = self.trickle.begin_interval()
+            if await self.wait(send_at):
+                continue
+                
+            if self.trickle.should_transmit() or self.refresh_due():
+                try:
+                    await self.send_announce(self.build_announcement())
+                    self.last_announced = time.monotonic()
+                    self.stats['announces_sent'] += 1
+                    metrics.inc('discovery_announces_total', result='sent')
+                except Exception as e:
+                    logger.warning("Failed to announce presence: %s", e)
+                    metrics.inc('discovery_announce_failures_total')
+            else:
+                self.stats['announces_suppressed'] += 1
+                metrics.inc('discovery_announces_total', result='suppressed')
+                
+            if await self.wait(interval - send_at):
+                continue
+            self.trickle.expire_interval()
+            
+            expired = self.expire_peers()
+            if expired and on_expired:
+                on_expired(expired)
\ No newline at end of file
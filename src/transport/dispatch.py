@@ -0,0 +1,149 @@
+import asyncio
+import itertools
+import logging
+from collections import deque
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CONTROL = 'control'
+DATA = 'data'
+
+class PacketDispatcher:
+    def __init__(self, workers=4, control_workers=1, control_queue_size=256,
+                 data_queue_size=64):
+        self.handlers = {}
+        self.queues = {
+            CONTROL: asyncio.PriorityQueue(maxsize=control_queue_size),
+            DATA: asyncio.PriorityQueue(maxsize=data_queue_size)
+        }
+        self.available = asyncio.Semaphore(0)
+        self.worker_count = workers
+        self.control_worker_count = control_workers
+        self.workers = []
+        self.sequence = itertools.count()
+        self.recent_errors = deque(maxlen=32)
+        self.stats = {
+            'received': 0,
+            'dispatched': 0,
+            'unhandled': 0,
+            'errors': 0,
+            'dropped': {CONTROL: 0, DATA: 0},
+            'high_water': {CONTROL: 0, DATA: 0}
+        }
+        
+    def register(self, packet_type, handler, plane=CONTROL, priority=0):
+        #\"\"\"Route packets of a type to a handler on a plane\"\"\"
+        if plane not in self.queues:
+            raise ValueError(f"Unknown dispatch plane {plane}")
+        self.handlers[packet_type] = {
+            'handler': handler,
+            'plane': plane,
+            'priority': priority
+        }
+        
+    def unregister(self, packet_type):
+        return self.handlers.pop(packet_type, None)
+        
+    def route(self, packet):
+        entry = self.handlers.get(getattr(packet, 'type', None))
+        if entry is None:
+            self.stats['unhandled'] += 1
+        return entry
+        
+    def submit(self, packet):
+        #\"\"\"Queue a packet without blocking the receive path\"\"\"
+        self.stats['received'] += 1
+        entry = self.route(packet)
+        if entry is None:
+            return False
+            
+        queue = self.queues[entry['plane']]
+        try:
+            queue.put_nowait((entry['priority'], next(self.sequence), packet, entry))
+        except asyncio.QueueFull:
+            self.stats['dropped'][entry['plane']] += 1
+            metrics.inc('dispatch_dropped_total', plane=entry['plane'])
+            return False
+            
+        self.track_depth(entry['plane'])
+        self.available.release()
+        return True
+        
+    async def submit_wait(self, packet):
+        #\"\"\"Queue a packet, applying backpressure when the plane is full\"\"\"
+        self.stats['received'] += 1
+        entry = self.route(packet)
+        if entry is None:
+            return False
+            
+        await self.queues[entry['plane']].put(
+            (entry['priority'], next(self.sequence), packet, entry)
+        )
+        self.track_depth(entry['plane'])
+        self.available.release()
+        return True
+        
+    def track_depth(self, plane):
+        depth = self.queues[plane].qsize()
+        metrics.set('dispatch_queue_depth', depth, plane=plane)
+        if depth > self.stats['high_water'][plane]:
+            self.stats['high_water'][plane] = depth
+            
+    def next_item(self):
+        # Control traffic always goes first
+        for plane in (CONTROL, DATA):
+            queue = self.queues[plane]
+            if not queue.empty():
+                return queue, queue.get_nowait()
+        return None, None
+        
+    async def run_handler(self, queue, item):
+        _, _, packet, entry = item
+        packet_type = getattr(packet, 'type', None)
+        try:
+            with metrics.span('dispatch_handler', type=packet_type):
+                await entry['handler'](packet)
+            self.stats['dispatched'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.recent_errors.append((packet_type, repr(e)))
+            metrics.inc('dispatch_errors_total', type=packet_type)
+            logger.warning("Handler for %s packet failed: %s", packet_type, e, exc_info=True)
+        finally:
+            queue.task_done()
+            
+    async def worker(self):
+        while True:
+            await self.available.acquire()
+            queue, item = self.next_item()
+            if item is not None:
+                await self.run_handler(queue, item)
+                
+    async def control_worker(self):
+        #\"\"\"Reserved for control packets so bulk data cannot starve them\"\"\"
+        queue = self.queues[CONTROL]
+        while True:
+            item = await queue.get()
+            await self.run_handler(queue, item)
+            
+    async def start(self):
+        if self.workers:
+            return
+        for _ in range(self.control_worker_count):
+            self.workers.append(asyncio.create_task(self.control_worker()))
+        for _ in range(max(self.worker_count - self.control_worker_count, 1)):
+            self.workers.append(asyncio.create_task(self.worker()))
+            
+    async def join(self):
+        for queue in self.queues.values():
+            await queue.join()
+            
+    async def stop(self):
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        
+    def queue_depths(self):
+        return {plane: queue.qsize() for plane, queue in self.queues.items()}
\ No newline at end of file
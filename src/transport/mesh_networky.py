@@ -1,76 +1,156 @@
 import asyncio
-import RNS
+import logging
+import time
 from datetime import datetime
+from ..utils.metrics import metrics
+from .route_table import RouteTable
+from .routing import RoutingEngine
+from .discovery import PeerDiscovery
+from .dispatch import PacketDispatcher, CONTROL, DATA
+
+logger = logging.getLogger(__name__)
 
 class ReticulumMeshNetwork:
-    def __init__(self):
+    def __init__(self, interface=None):
         self.reticulum = None
+        self.interface = interface
         self.peers = {}
-        self.routes = {}
+        self.routes = RouteTable()
+        self.routing = RoutingEngine('local')
+        self.revalidations = {}
         self.announcements = {}
+        self.discovery = PeerDiscovery(None, self.announce_presence)
+        self.maintenance_task = None
+        self.discovery_task = None
+        self.data_receiver = None
+        self.dispatcher = PacketDispatcher()
+        self.dispatcher.register('peer_discovery', self.handle_peer_discovery, CONTROL)
+        self.dispatcher.register('route', self.handle_route_update, CONTROL)
+        self.dispatcher.register('data', self.handle_data_packet, DATA)
         
     async def initialize(self):
         #\"\"\"Initialize Reticulum mesh network\"\"\"
-        self.reticulum = RNS.Reticulum()
-        
+        # A stand-in interface (e.g. the mesh simulator) replaces the RNS stack
+        if self.interface is not None:
+            self.reticulum = self.interface
+        else:
+            # Imported here so nodes that never open a radio start fast
+            import RNS
+            self.reticulum = RNS.Reticulum()
+            
         # Set up packet handlers
+        await self.dispatcher.start()
         self.reticulum.register_packet_handler(
             self.handle_packet
         )
         
+        # Keep known routes fresh in the background
+        self.maintenance_task = asyncio.create_task(self.maintain_routes())
+        
         # Start peer discovery
         await self.start_peer_discovery()
         
     async def start_peer_discovery(self):
         #\"\"\"Start peer discovery process\"\"\"
-        announcement = {
-            'type': 'peer_discovery',
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        while True:
-            await self.announce_presence(announcement)
-            await asyncio.sleep(300)  # Announce every 5 minutes
+        if self.discovery_task and not self.discovery_task.done():
+            return self.discovery_task
             
+        self.discovery.node_id = getattr(self.reticulum, 'destination_hash', None)
+        self.discovery_task = asyncio.create_task(
+            self.discovery.run(on_expired=self.handle_expired_peers)
+        )
+        return self.discovery_task
+        
     async def announce_presence(self, announcement):
         #\"\"\"Announce presence to network\"\"\"
-        self.announcements[self.reticulum.destination_hash] = {
-            'timestamp': datetime.now(),
-            'data': announcement
-        }
-        
+        if self.interface is not None:
+            await self.interface.broadcast('peer_discovery', announcement)
+            return announcement
+            
         # Implement actual Reticulum announcement
         # This is a placeholder for the actual implementation
+        return announcement
         
+    async def handle_peer_discovery(self, packet):
+        #\"\"\"Handle a peer announce, dropping flooded duplicates\"\"\"
+        observed = self.discovery.observe(packet.data)
+        if not observed:
+            return None
+            
+        peer, is_new = observed
+        self.peers[peer['id']] = peer
+        self.announcements[peer['id']] = {
+            'timestamp': peer['last_seen'],
+            'data': packet.data
+        }
+        
+        # Announces heard first-hand describe a direct radio link
+        if packet.data.get('hops', 0) == 0:
+            link_metrics = {
+                name: getattr(packet, name)
+                for name in ('rssi', 'snr')
+                if getattr(packet, name, None) is not None
+            }
+            if is_new or link_metrics:
+                self.update_link('local', peer['id'], **link_metrics)
+        return peer
+        
+    def handle_expired_peers(self, peer_ids):
+        #\"\"\"Forget peers that stopped announcing\"\"\"
+        for peer_id in peer_ids:
+            self.peers.pop(peer_id, None)
+            self.announcements.pop(peer_id, None)
+            self.routes.remove(peer_id)
+            self.refresh_routes(self.routing.remove_node(peer_id))
+            
     async def handle_packet(self, packet):
         #\"\"\"Handle incoming packets\"\"\"
-        try:
-            if packet.type == 'peer_discovery':
-                await self.handle_peer_discovery(packet)
-            elif packet.type == 'data':
-                await self.handle_data_packet(packet)
-            elif packet.type == 'route':
-                await self.handle_route_update(packet)
-        except Exception as e:
-            print(f"Error handling packet: {e}")
+        # Handlers run on the dispatcher's workers, off the receive path
+        metrics.inc('mesh_packets_received_total', type=getattr(packet, 'type', None))
+        return self.dispatcher.submit(packet)
+        
+    async def handle_data_packet(self, packet):
+        #\"\"\"Deliver application data to the registered receiver\"\"\"
+        if self.data_receiver:
+            await self.data_receiver(packet)
             
+    @metrics.timed('mesh_send')
     async def send_to_peer(self, peer_id, data):
         #\"\"\"Send data to specific peer\"\"\"
         peer = self.peers.get(peer_id)
         if not peer:
             raise Exception("Peer not found")
             
-        route = self.find_route(peer_id)
+        route = await self.find_route(peer_id)
         if not route:
             route = await self.discover_route(peer_id)
+            if not route:
+                raise Exception(f"No route to peer {peer_id}")
+            route = self.routes.update(peer_id, route)
             
         # Send data through route
-        return await self.send_through_route(route, data)
+        started = time.monotonic()
+        try:
+            result = await self.send_through_route(route, data)
+        except Exception:
+            self.routes.record_metrics(peer_id, delivered=False)
+            self.schedule_revalidation(peer_id)
+            raise
+            
+        self.routes.record_metrics(
+            peer_id,
+            delivered=True,
+            rtt=time.monotonic() - started
+        )
+        return result
         
     async def find_route(self, peer_id):
         #\"\"\"Find route to peer\"\"\"
         route = self.routes.get(peer_id)
         if route and self.is_route_valid(route):
+            # Serve the known route and refresh it off the send path
+            if self.routes.needs_revalidation(route):
+                self.schedule_revalidation(peer_id)
             return route
             
         # Route not found or invalid
@@ -78,24 +158,154 @@ class ReticulumMeshNetwork:
         
     def is_route_valid(self, route):
         #\"\"\"Check if route is still valid\"\"\"
-        # Check last validation time
-        if 'last_validated' not in route:
-            return False
+        return self.routes.is_usable(route)
+        
+    def schedule_revalidation(self, peer_id):
+        #\"\"\"Start a single background revalidation per peer\"\"\"
+        task = self.revalidations.get(peer_id)
+        if task and not task.done():
+            return task
+            
+        task = asyncio.create_task(self.revalidate_route(peer_id))
+        self.revalidations[peer_id] = task
+        task.add_done_callback(lambda _: self.revalidations.pop(peer_id, None))
+        return task
+        
+    async def revalidate_route(self, peer_id):
+        #\"\"\"Re-check a route, falling back to discovery if it fails\"\"\"
+        route = self.routes.get(peer_id)
+        try:
+            if route and await self.validate_route(route):
+                self.routes.update(peer_id, dict(route, last_validated=datetime.now()))
+                return self.routes.get(peer_id)
+        except Exception as e:
+            logger.warning("Route validation to %s failed: %s", peer_id, e)
+            metrics.inc('mesh_route_validation_failures_total')
+            
+        discovered = await self.discover_route(peer_id)
+        if discovered:
+            return self.routes.update(peer_id, discovered)
             
-        age = datetime.now() - route['last_validated']
-        return age.total_seconds() < 3600  # Valid for 1 hour
+        if route and not self.routes.is_usable(route):
+            self.routes.remove(peer_id)
+        return None
+        
+    async def validate_route(self, route):
+        #\"\"\"Probe a route end to end\"\"\"
+        started = time.monotonic()
+        result = await self.send_through_route(route, {'type': 'route_probe'})
+        delivered = result.get('status') == 'sent'
+        self.routes.record_metrics(
+            route['peer_id'],
+            delivered=delivered,
+            rtt=time.monotonic() - started if delivered else None
+        )
+        return delivered
         
+    async def maintain_routes(self, interval=60):
+        #\"\"\"Proactively revalidate routes before they expire\"\"\"
+        while True:
+            for route in self.routes.due_for_revalidation():
+                self.schedule_revalidation(route['peer_id'])
+            self.routes.purge_expired()
+            await asyncio.sleep(interval)
+            
     async def discover_route(self, peer_id):
         #\"\"\"Discover route to peer\"\"\"
-        # Implement route discovery
-        # This is a placeholder for the actual implementation
-        return None
+        path = self.routing.path_to(peer_id)
+        if not path or len(path) < 2:
+            # Active route requests are not implemented yet
+            return None
+            
+        return self.route_from_path(path)
+        
+    def route_from_path(self, path):
+        return {
+            'next_hop': path[1],
+            'hops': len(path) - 1,
+            'path': path,
+            'cost': self.routing.path_cost(path),
+            'last_validated': datetime.now()
+        }
+        
+    def update_link(self, a, b, **link_metrics):
+        #\"\"\"Apply a link observation and re-route affected peers\"\"\"
+        changed = self.routing.set_link(a, b, **link_metrics)
+        self.refresh_routes(changed)
+        return changed
+        
+    def remove_link(self, a, b):
+        changed = self.routing.remove_link(a, b)
+        self.refresh_routes(changed)
+        return changed
+        
+    def refresh_routes(self, nodes):
+        #\"\"\"Replace cached routes whose shortest path moved\"\"\"
+        for peer_id in nodes:
+            if peer_id not in self.routes:
+                continue
+            path = self.routing.path_to(peer_id)
+            if path and len(path) > 1:
+                self.routes.update(peer_id, self.route_from_path(path))
+            else:
+                self.routes.remove(peer_id)
+                
+    async def handle_route_update(self, packet):
+        #\"\"\"Merge a neighbor's link-state advertisement\"\"\"
+        update = packet.data
+        changed = set()
+        for neighbor, link_metrics in update.get('links', {}).items():
+            changed |= self.routing.set_link(update['node'], neighbor, **link_metrics)
+        for neighbor in update.get('lost', []):
+            changed |= self.routing.remove_link(update['node'], neighbor)
+        self.refresh_routes(changed)
+        
+    async def send_multipath(self, peer_id, data, max_paths=3):
+        #\"\"\"Split a large transfer across disjoint paths\"\"\"
+        plan = self.routing.split_transfer(peer_id, len(data), max_paths)
+        if len(plan) <= 1:
+            return await self.send_to_peer(peer_id, data)
+            
+        results = await asyncio.gather(*[
+            self.send_through_route(
+                self.route_from_path(part['path']),
+                {
+                    'type': 'segment',
+                    'offset': part['offset'],
+                    'total': len(data),
+                    'data': data[part['offset']:part['offset'] + part['length']]
+                }
+            )
+            for part in plan
+        ])
+        
+        return {
+            'status': 'sent' if all(r.get('status') == 'sent' for r in results) else 'partial',
+            'paths': [part['path'] for part in plan],
+            'segments': [part['length'] for part in plan],
+            'timestamp': datetime.now().isoformat()
+        }
         
     async def send_through_route(self, route, data):
         #\"\"\"Send data through specific route\"\"\"
+        if self.interface is not None:
+            return await self.interface.send(route['path'], data)
+            
         # Implement actual sending
         # This is a placeholder for the actual implementation
         return {
             'status': 'sent',
             'timestamp': datetime.now().isoformat()
-        }
\ No newline at end of file
+        }
+        
+    async def shutdown(self):
+        #\"\"\"Stop background tasks and packet workers\"\"\"
+        tasks = [
+            task for task in (self.maintenance_task, self.discovery_task)
+            if task and not task.done()
+        ]
+        tasks.extend(self.revalidations.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.dispatcher.stop()
\ No newline at end of file
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+class RouteTable:
+    def __init__(self, lifetime=3600, refresh_ratio=0.75, stale_grace=600,
+                 max_loss=0.5, smoothing=0.25):
+        self.routes = {}
+        self.lifetime = timedelta(seconds=lifetime)
+        self.refresh_after = timedelta(seconds=lifetime * refresh_ratio)
+        self.stale_grace = timedelta(seconds=stale_grace)
+        self.max_loss = max_loss
+        self.smoothing = smoothing
+        
+    def __contains__(self, peer_id):
+        return peer_id in self.routes
+        
+    def __len__(self):
+        return len(self.routes)
+        
+    def get(self, peer_id, default=None):
+        return self.routes.get(peer_id, default)
+        
+    def update(self, peer_id, route):
+        #\"\"\"Insert or refresh a validated route\"\"\"
+        existing = self.routes.get(peer_id, {})
+        route = dict(route)
+        route['peer_id'] = peer_id
+        route['last_validated'] = route.get('last_validated', datetime.now())
+        route['metrics'] = dict(
+            existing.get('metrics') or self.new_metrics(),
+            **route.get('metrics', {})
+        )
+        self.routes[peer_id] = route
+        return route
+        
+    def remove(self, peer_id):
+        return self.routes.pop(peer_id, None)
+        
+    def new_metrics(self):
+        return {
+            'rssi': None,
+            'snr': None,
+            'loss': 0.0,
+            'rtt': None,
+            'sent': 0,
+            'failed': 0
+        }
+        
+    def record_metrics(self, peer_id, delivered=True, rtt=None, rssi=None, snr=None):
+        #\"\"\"Fold a delivery observation into the route's link metrics\"\"\"
+        route = self.routes.get(peer_id)
+        if not route:
+            return None
+            
+        metrics = route['metrics']
+        alpha = self.smoothing
+        metrics['sent'] += 1
+        if not delivered:
+            metrics['failed'] += 1
+        metrics['loss'] = (1 - alpha) * metrics['loss'] + alpha * (0.0 if delivered else 1.0)
+        
+        for name, value in (('rtt', rtt), ('rssi', rssi), ('snr', snr)):
+            if value is None:
+                continue
+            if metrics[name] is None:
+                metrics[name] = value
+            else:
+                metrics[name] = (1 - alpha) * metrics[name] + alpha * value
+        return metrics
+        
+    def state(self, route, now=None):
+        #\"\"\"Classify a route as fresh, refresh, stale or expired\"\"\"
+        if not route or 'last_validated' not in route:
+            return 'expired'
+            
+        age = (now or datetime.now()) - route['last_validated']
+        if age < self.refresh_after:
+            return 'fresh'
+        if age < self.lifetime:
+            return 'refresh'
+        if age < self.lifetime + self.stale_grace:
+            return 'stale'
+        return 'expired'
+        
+    def is_usable(self, route, now=None):
+        #\"\"\"A route can carry traffic while revalidation is pending\"\"\"
+        if self.state(route, now) == 'expired':
+            return False
+        return route.get('metrics', {}).get('loss', 0.0) <= self.max_loss
+        
+    def needs_revalidation(self, route, now=None):
+        return self.state(route, now) in ('refresh', 'stale')
+        
+    def due_for_revalidation(self, now=None):
+        #\"\"\"Routes approaching expiry, least recently validated first\"\"\"
+        due = [
+            route for route in self.routes.values()
+            if self.needs_revalidation(route, now)
+        ]
+        return sorted(due, key=lambda route: route['last_validated'])
+        
+    def purge_expired(self, now=None):
+        expired = [
+            peer_id for peer_id, route in self.routes.items()
+            if self.state(route, now) == 'expired'
+        ]
+        for peer_id in expired:
+            del self.routes[peer_id]
+        return expired
\ No newline at end of file
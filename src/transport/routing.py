@@ -0,0 +1,223 @@
+import heapq
+from datetime import datetime
+
+INFINITY = float('inf')
+
+class RoutingEngine:
+    def __init__(self, source, default_bandwidth=1200):
+        self.source = source
+        self.default_bandwidth = default_bandwidth  # bytes per second
+        self.links = {source: {}}
+        self.incoming = {source: {}}
+        self.dist = {source: 0.0}
+        self.parent = {source: None}
+        
+    def link_cost(self, link):
+        #\"\"\"Expected airtime per byte, inflated by loss and weak signal\"\"\"
+        bandwidth = link.get('bandwidth') or self.default_bandwidth
+        airtime = link.get('airtime', 1.0 / bandwidth)
+        
+        # Expected transmissions per delivered packet
+        etx = 1.0 / max(1.0 - link.get('loss', 0.0), 0.05)
+        
+        quality = 1.0
+        if link.get('snr') is not None:
+            quality *= min(max((link['snr'] + 20.0) / 30.0, 0.1), 1.0)
+        if link.get('rssi') is not None:
+            quality *= min(max((link['rssi'] + 130.0) / 80.0, 0.1), 1.0)
+            
+        return airtime * etx / quality
+        
+    def link_capacity(self, link):
+        #\"\"\"Usable goodput of a link in bytes per second\"\"\"
+        bandwidth = link.get('bandwidth') or self.default_bandwidth
+        return bandwidth * max(1.0 - link.get('loss', 0.0), 0.0)
+        
+    def set_link(self, a, b, symmetric=True, **metrics):
+        #\"\"\"Add or update a link and repair shortest paths incrementally\"\"\"
+        changed = self.update_edge(a, b, metrics)
+        if symmetric:
+            changed |= self.update_edge(b, a, metrics)
+        return changed
+        
+    def remove_link(self, a, b, symmetric=True):
+        changed = self.remove_edge(a, b)
+        if symmetric:
+            changed |= self.remove_edge(b, a)
+        return changed
+        
+    def remove_node(self, node):
+        changed = set()
+        for neighbor in list(self.links.get(node, {})):
+            changed |= self.remove_edge(node, neighbor)
+        for neighbor in list(self.incoming.get(node, {})):
+            changed |= self.remove_edge(neighbor, node)
+        return changed
+        
+    def update_edge(self, a, b, metrics):
+        old = self.links.get(a, {}).get(b)
+        link = dict(old or {}, **metrics)
+        link['updated'] = datetime.now()
+        link['cost'] = self.link_cost(link)
+        
+        self.links.setdefault(a, {})[b] = link
+        self.incoming.setdefault(b, {})[a] = link
+        self.links.setdefault(b, {})
+        self.incoming.setdefault(a, {})
+        
+        if old is None or link['cost'] < old['cost']:
+            return self.relax_from([(self.dist.get(a, INFINITY) + link['cost'], b, a)])
+        if link['cost'] > old['cost'] and self.parent.get(b) == a:
+            return self.repair_subtree(b)
+        return set()
+        
+    def remove_edge(self, a, b):
+        if b not in self.links.get(a, {}):
+            return set()
+        del self.links[a][b]
+        del self.incoming[b][a]
+        if self.parent.get(b) == a:
+            return self.repair_subtree(b)
+        return set()
+        
+    def relax_from(self, seeds):
+        #\"\"\"Dijkstra restricted to nodes whose distance improves\"\"\"
+        heap = [seed for seed in seeds if seed[0] < INFINITY]
+        heapq.heapify(heap)
+        changed = set()
+        
+        while heap:
+            distance, node, parent = heapq.heappop(heap)
+            if distance >= self.dist.get(node, INFINITY):
+                continue
+            self.dist[node] = distance
+            self.parent[node] = parent
+            changed.add(node)
+            for neighbor, link in self.links.get(node, {}).items():
+                candidate = distance + link['cost']
+                if candidate < self.dist.get(neighbor, INFINITY):
+                    heapq.heappush(heap, (candidate, neighbor, node))
+                    
+        return changed
+        
+    def repair_subtree(self, root):
+        #\"\"\"Recompute distances for nodes routed through a worsened link\"\"\"
+        children = {}
+        for node, parent in self.parent.items():
+            if parent is not None:
+                children.setdefault(parent, []).append(node)
+                
+        affected = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            affected.add(node)
+            stack.extend(children.get(node, []))
+            
+        for node in affected:
+            self.dist.pop(node, None)
+            self.parent.pop(node, None)
+            
+        # Re-attach each affected node through its best unaffected neighbor
+        seeds = []
+        for node in affected:
+            for neighbor, link in self.incoming.get(node, {}).items():
+                if neighbor not in affected and neighbor in self.dist:
+                    seeds.append((self.dist[neighbor] + link['cost'], node, neighbor))
+                    
+        self.relax_from(seeds)
+        return affected
+        
+    def path_to(self, destination):
+        if destination not in self.dist:
+            return None
+            
+        path = [destination]
+        while path[-1] != self.source:
+            path.append(self.parent[path[-1]])
+        path.reverse()
+        return path
+        
+    def path_cost(self, path):
+        return sum(self.links[a][b]['cost'] for a, b in zip(path, path[1:]))
+        
+    def path_capacity(self, path):
+        return min(self.link_capacity(self.links[a][b]) for a, b in zip(path, path[1:]))
+        
+    def shortest_path(self, destination, excluded_nodes=(), excluded_links=()):
+        #\"\"\"One-off Dijkstra over the graph minus excluded nodes and links\"\"\"
+        dist = {self.source: 0.0}
+        parent = {self.source: None}
+        heap = [(0.0, self.source)]
+        
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if node == destination:
+                break
+            if distance > dist[node]:
+                continue
+            for neighbor, link in self.links.get(node, {}).items():
+                if neighbor in excluded_nodes or (node, neighbor) in excluded_links:
+                    continue
+                candidate = distance + link['cost']
+                if candidate < dist.get(neighbor, INFINITY):
+                    dist[neighbor] = candidate
+                    parent[neighbor] = node
+                    heapq.heappush(heap, (candidate, neighbor))
+                    
+        if destination not in dist:
+            return None
+        path = [destination]
+        while path[-1] != self.source:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return path
+        
+    def disjoint_paths(self, destination, max_paths=3):
+        #\"\"\"Greedy node-disjoint paths, cheapest first\"\"\"
+        paths = []
+        excluded_nodes = set()
+        excluded_links = set()
+        
+        while len(paths) < max_paths:
+            path = self.shortest_path(destination, excluded_nodes, excluded_links)
+            if not path:
+                break
+            paths.append(path)
+            excluded_nodes.update(path[1:-1])
+            if len(path) == 2:
+                # A direct link can only be used once
+                excluded_links.add((path[0], path[1]))
+                
+        return paths
+        
+    def split_transfer(self, destination, size, max_paths=3):
+        #\"\"\"Assign byte ranges to disjoint paths in proportion to capacity\"\"\"
+        paths = self.disjoint_paths(destination, max_paths)
+        if not paths:
+            return []
+            
+        capacities = [self.path_capacity(path) for path in paths]
+        total = sum(capacities)
+        if total <= 0:
+            capacities = [1.0] * len(paths)
+            total = float(len(paths))
+            
+        plan = []
+        offset = 0
+        for index, (path, capacity) in enumerate(zip(paths, capacities)):
+            if index == len(paths) - 1:
+                length = size - offset
+            else:
+                length = int(size * capacity / total)
+            if length <= 0:
+                continue
+            plan.append({
+                'path': path,
+                'offset': offset,
+                'length': length,
+                'capacity': capacity
+            })
+            offset += length
+            
+        return plan
\ No newline at end of file
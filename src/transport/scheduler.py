@@ -0,0 +1,187 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from ..utils.metrics import metrics
+from ..utils.network import NetworkUtils
+
+# Fraction of airtime a transmitter may use per window, by region
+REGIONAL_DUTY_CYCLES = {
+    'EU868': 0.01,
+    'EU868_G3': 0.1,
+    'US915': 1.0,
+    'AU915': 1.0
+}
+
+PRIORITY_CONTROL = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+
+class LinkBudget:
+    def __init__(self, bandwidth, duty_cycle, window, overhead):
+        self.bandwidth = bandwidth
+        self.duty_cycle = duty_cycle
+        self.window = window
+        self.overhead = overhead
+        self.history = deque()
+        self.used = 0.0
+        
+    def trim(self, now):
+        while self.history and self.history[0][0] <= now - self.window:
+            _, airtime = self.history.popleft()
+            self.used -= airtime
+            
+    def wait_time(self, airtime, now):
+        #\"\"\"Seconds until the window has room for this much airtime\"\"\"
+        self.trim(now)
+        allowed = self.duty_cycle * self.window
+        if self.used + airtime <= allowed:
+            return 0.0
+            
+        # Walk forward through history until enough airtime ages out
+        excess = self.used + airtime - allowed
+        for sent_at, used in self.history:
+            excess -= used
+            if excess <= 0:
+                return sent_at + self.window - now
+        return self.window
+        
+    def record(self, airtime, now):
+        self.history.append((now, airtime))
+        self.used += airtime
+
+class TransmitScheduler:
+    # Duty-cycle rules apply per transmitter, so one budget and one drain
+    # loop cover the whole radio; only bandwidth is tracked per link
+    def __init__(self, transmit, bandwidth=1200, duty_cycle=1.0, window=3600,
+                 overhead=20, region=None):
+        if region is not None:
+            if region not in REGIONAL_DUTY_CYCLES:
+                raise ValueError(f"Unknown region {region!r}")
+            duty_cycle = REGIONAL_DUTY_CYCLES[region]
+            
+        self.transmit = transmit
+        self.default_bandwidth = bandwidth
+        self.overhead = overhead
+        self.budget = LinkBudget(bandwidth, duty_cycle, window, overhead)
+        self.bandwidths = {}
+        self.queue = []
+        self.wakeup = asyncio.Event()
+        self.worker = None
+        self.sequence = itertools.count()
+        self.stats = {
+            'sent': 0,
+            'bytes_sent': 0,
+            'airtime': 0.0,
+            'expired': 0,
+            'duty_cycle_waits': 0
+        }
+        
+    def configure_link(self, link, bandwidth):
+        self.bandwidths[link] = bandwidth
+        
+    def configure_radio(self, duty_cycle=None, window=None):
+        if duty_cycle is not None:
+            self.budget.duty_cycle = duty_cycle
+        if window is not None:
+            self.budget.window = window
+            
+    def airtime(self, link, payload):
+        return NetworkUtils.estimate_transmission_time(
+            NetworkUtils.calculate_packet_size(payload, self.overhead),
+            self.bandwidths.get(link, self.default_bandwidth)
+        )
+        
+    def observe(self, link, size, seconds, smoothing=0.25):
+        #\"\"\"Fold a measured transmission into the link's bandwidth estimate\"\"\"
+        if seconds > 0:
+            bandwidth = self.bandwidths.get(link, self.default_bandwidth)
+            self.bandwidths[link] = (1 - smoothing) * bandwidth + smoothing * size / seconds
+            
+    def submit(self, link, payload, priority=PRIORITY_INTERACTIVE, deadline=None):
+        #\"\"\"Queue a payload; the returned future resolves once it is on air\"\"\"
+        future = asyncio.get_running_loop().create_future()
+        deadline = deadline if deadline is not None else float('inf')
+        heapq.heappush(
+            self.queue,
+            (priority, deadline, next(self.sequence), link, payload, future)
+        )
+        self.wakeup.set()
+        
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+        return future
+        
+    async def send(self, link, payload, priority=PRIORITY_INTERACTIVE, deadline=None):
+        return await self.submit(link, payload, priority, deadline)
+        
+    async def run(self):
+        #\"\"\"Drain the queue, across all links, within the radio's duty-cycle budget\"\"\"
+        queue = self.queue
+        budget = self.budget
+        
+        while True:
+            if not queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+                
+            _, deadline, _, link, payload, future = queue[0]
+            now = time.monotonic()
+            if deadline < now or future.cancelled():
+                heapq.heappop(queue)
+                if not future.done():
+                    self.stats['expired'] += 1
+                    metrics.inc('transport_expired_total', link=link)
+                    future.set_exception(TimeoutError("Transmission deadline passed"))
+                continue
+                
+            airtime = self.airtime(link, payload)
+            delay = budget.wait_time(airtime, now)
+            if delay > 0:
+                # Sleep until the budget frees up or something more urgent arrives
+                self.stats['duty_cycle_waits'] += 1
+                metrics.inc('transport_duty_cycle_waits_total')
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+                
+            heapq.heappop(queue)
+            budget.record(airtime, now)
+            try:
+                # One packet at a time: the radio is half-duplex
+                result = await self.transmit(link, payload)
+            except Exception as e:
+                metrics.inc('transport_transmit_failures_total', link=link)
+                if not future.done():
+                    future.set_exception(e)
+                continue
+                
+            if isinstance(result, dict) and result.get('airtime'):
+                self.observe(
+                    link,
+                    NetworkUtils.calculate_packet_size(payload, self.overhead),
+                    result['airtime']
+                )
+                
+            self.stats['sent'] += 1
+            self.stats['bytes_sent'] += len(payload)
+            self.stats['airtime'] += airtime
+            metrics.inc('transport_airtime_seconds_total', airtime, link=link)
+            if not future.done():
+                future.set_result(result)
+                
+    def pending(self, link=None):
+        if link is not None:
+            return sum(1 for entry in self.queue if entry[3] == link)
+        return len(self.queue)
+        
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            await asyncio.gather(self.worker, return_exceptions=True)
+            self.worker = None
\ No newline at end of file
@@ -1,12 +1,23 @@
 import asyncio
 from datetime import datetime
+from ..utils import streams
 from ..utils.crypto import CryptoHandler
+from ..utils.metrics import metrics
+from ..utils.network import NetworkUtils
+from .scheduler import TransmitScheduler, PRIORITY_INTERACTIVE
 
 class SecureReticulumTransport:
-    def __init__(self):
+    def __init__(self, region=None, interface=None):
         self.crypto = CryptoHandler()
+        self.interface = interface
         self.sessions = {}
         self.packet_size = 250  # LoRa packet size limit
+        self.header_size = 20
+        self.scheduler = TransmitScheduler(
+            self.transmit_packet,
+            overhead=self.header_size,
+            region=region
+        )
         
     async def establish_session(self, peer_id=None):
         #\"\"\"Establish secure session with peer\"\"\"
@@ -19,13 +30,17 @@ class SecureReticulumTransport:
             'private_key': private_key,
             'public_key': public_key,
             'established': datetime.now(),
-            'last_activity': datetime.now()
+            'last_activity': datetime.now(),
+            # Per-session counters stay here; metric labels are per link
+            # so the exported series do not grow with every session
+            'fragments_sent': 0,
+            'bytes_on_air': 0
         }
         
         self.sessions[session['id']] = session
         return session
         
-    async def send_data(self, session_id, data):
+    async def send_data(self, session_id, data, priority=PRIORITY_INTERACTIVE, deadline=None):
         #\"\"\"Send data securely\"\"\"
         session = self.sessions.get(session_id)
         if not session:
@@ -34,35 +49,102 @@ class SecureReticulumTransport:
         # Fragment data if needed
         fragments = self.fragment_data(data)
         
-        # Encrypt and send each fragment
-        results = []
-        for fragment in fragments:
-            encrypted = self.crypto.encrypt_data(fragment)
-            result = await self.send_packet(
-                session,
-                encrypted
-            )
-            results.append(result)
-            
+        # Encrypt every fragment and queue them together so the scheduler
+        # can keep the link busy within its duty-cycle budget
+        packets = [self.crypto.encrypt_data(fragment) for fragment in fragments]
+        results = await asyncio.gather(*[
+            self.send_packet(session, packet, priority, deadline)
+            for packet in packets
+        ])
+        
+        self.count_sent(
+            session,
+            len(packets),
+            sum(len(packet) for packet in packets) + len(packets) * self.header_size
+        )
+        
         return {
             'fragments_sent': len(results),
             'total_bytes': sum(len(f) for f in fragments)
         }
         
+    async def send_stream(self, session_id, chunks, priority=PRIORITY_INTERACTIVE,
+                          deadline=None, window=16):
+        #\"\"\"Send a stream of any length with at most window packets in flight\"\"\"
+        session = self.sessions.get(session_id)
+        if not session:
+            raise Exception("Invalid session")
+            
+        # Full-size fragments; only the last one may be short
+        capacity = self.crypto.max_plaintext_size(self.packet_size - self.header_size)
+        pending = set()
+        fragments = 0
+        total_bytes = 0
+        on_air = 0
+        try:
+            async for fragment in streams.rechunk(chunks, capacity):
+                if len(pending) >= window:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                        
+                packet = self.crypto.encrypt_data(fragment)
+                pending.add(asyncio.ensure_future(
+                    self.send_packet(session, packet, priority, deadline)
+                ))
+                fragments += 1
+                total_bytes += len(fragment)
+                on_air += len(packet) + self.header_size
+                
+            if pending:
+                await asyncio.gather(*pending)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
+        finally:
+            self.count_sent(session, fragments, on_air)
+            
+        return {
+            'fragments_sent': fragments,
+            'total_bytes': total_bytes
+        }
+        
+    def count_sent(self, session, fragments, on_air):
+        session['fragments_sent'] += fragments
+        session['bytes_on_air'] += on_air
+        metrics.inc('transport_fragments_sent_total', fragments, link=session['peer_id'])
+        metrics.inc('transport_bytes_on_air_total', on_air, link=session['peer_id'])
+        
     def fragment_data(self, data):
         #\"\"\"Fragment data into LoRa-sized packets\"\"\"
+        # Largest plaintext whose ciphertext plus header still fits a packet
+        capacity = self.crypto.max_plaintext_size(self.packet_size - self.header_size)
+        fragment_size = NetworkUtils.optimize_packet_size(len(data), capacity) or 1
+        
         fragments = []
-        for i in range(0, len(data), self.packet_size):
-            fragment = data[i:i + self.packet_size]
+        for i in range(0, len(data), fragment_size):
+            fragment = data[i:i + fragment_size]
             fragments.append(fragment)
         return fragments
         
-    async def send_packet(self, session, packet):
+    async def send_packet(self, session, packet, priority=PRIORITY_INTERACTIVE, deadline=None):
         #\"\"\"Send single packet over Reticulum\"\"\"
+        return await self.scheduler.send(
+            session['peer_id'],
+            packet,
+            priority,
+            deadline
+        )
+        
+    async def transmit_packet(self, peer_id, packet):
+        #\"\"\"Put a single packet on air\"\"\"
+        if self.interface is not None:
+            return await self.interface.send(peer_id, packet)
+            
         # Add packet header
         header = {
-            'session_id': session['id'],
-            'sequence': len(self.sessions),
+            'peer_id': peer_id,
             'timestamp': datetime.now().isoformat()
         }
         
@@ -0,0 +1,469 @@
+import asyncio
+import heapq
+import itertools
+import json
+import random
+from collections import deque
+from datetime import datetime
+from ..utils import delta
+from ..utils.network import NetworkUtils
+from .scheduler import LinkBudget
+
+class PacketLost(Exception):
+    pass
+
+def payload_size(data):
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    return len(json.dumps(data, default=str).encode())
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+class SimulatedPacket:
+    def __init__(self, packet_type, data, source, destination=None, hops=0,
+                 rssi=None, snr=None):
+        self.type = packet_type
+        self.data = data
+        self.source = source
+        self.destination = destination
+        self.hops = hops
+        self.rssi = rssi
+        self.snr = snr
+
+class SimulatedInterface:
+    #\"\"\"One virtual node; stands in for the Reticulum stack of a node\"\"\"
+    def __init__(self, simulator, node_id, duty_cycle):
+        self.simulator = simulator
+        self.destination_hash = node_id
+        self.handlers = []
+        self.radio_free = 0.0
+        self.budget = LinkBudget(
+            simulator.bandwidth,
+            duty_cycle,
+            simulator.window,
+            simulator.overhead
+        )
+        self.seen = deque(maxlen=4096)
+        
+    @property
+    def node_id(self):
+        return self.destination_hash
+        
+    def register_packet_handler(self, handler):
+        self.handlers.append(handler)
+        
+    async def send(self, destination, data, packet_type='data'):
+        #\"\"\"Send along a path (list) or to a node id via the shortest path\"\"\"
+        return await self.simulator.send(self.node_id, destination, data, packet_type)
+        
+    async def broadcast(self, packet_type, data):
+        return await self.simulator.broadcast(self.node_id, packet_type, data)
+        
+    async def deliver(self, packet):
+        for handler in self.handlers:
+            await handler(packet)
+
+def encode_call(op, key, fields=None, body=b''):
+    #\"\"\"Storage request or reply: a JSON header line, then raw bytes\"\"\"
+    header = dict(fields or {}, op=op, key=key)
+    return json.dumps(header, separators=(',', ':')).encode() + b'\n' + body
+
+def decode_call(payload):
+    header, _, body = payload.partition(b'\n')
+    return json.loads(header), body
+
+def encode_update(op, key, message):
+    body = message['delta'] if message['type'] == 'delta' else message['data']
+    fields = {k: v for k, v in message.items() if k not in ('delta', 'data')}
+    return encode_call(op, key, fields, body)
+
+def decode_update(payload):
+    message, body = decode_call(payload)
+    message['delta' if message['type'] == 'delta' else 'data'] = body
+    return message
+
+class SimulatedPeer:
+    def __init__(self, peer_id, hops):
+        self.id = peer_id
+        self.hops = hops
+
+class StorageAdapter:
+    #\"\"\"Carries a DistributedStorageManager's peer calls over virtual radios\"\"\"
+    # Each call is a request and a reply packet along the shortest path;
+    # the replicas this node holds for others live in self.replicas
+    def __init__(self, simulator, node_id, manager):
+        self.simulator = simulator
+        self.node_id = node_id
+        self.manager = manager
+        self.replicas = {}
+        self.stats = {'calls': 0, 'failed': 0}
+        manager.find_storage_peers = self.find_storage_peers
+        manager.store_on_peer = self.store_on_peer
+        manager.retrieve_from_peer = self.retrieve_from_peer
+        manager.update_on_peer = self.update_on_peer
+        manager.retrieve_delta_from_peer = self.retrieve_delta_from_peer
+        
+    async def find_storage_peers(self, count):
+        #\"\"\"Nearest reachable storage nodes, as discovery would rank them\"\"\"
+        candidates = []
+        for node_id in self.simulator.storage:
+            path = self.simulator.path(self.node_id, node_id)
+            if node_id != self.node_id and path:
+                candidates.append((len(path) - 1, node_id))
+        peers = [SimulatedPeer(node_id, hops) for hops, node_id in sorted(candidates)[:count]]
+        for peer in peers:
+            self.manager.peers[peer.id] = peer
+        return peers
+        
+    async def call(self, peer, request):
+        self.stats['calls'] += 1
+        try:
+            await self.simulator.send(self.node_id, peer.id, request, 'storage')
+            remote = self.simulator.storage[peer.id]
+            try:
+                reply = remote.serve(request)
+            except Exception:
+                # The error reply still costs airtime
+                await self.simulator.send(peer.id, self.node_id, encode_call('error', None), 'storage')
+                raise
+            await self.simulator.send(peer.id, self.node_id, reply, 'storage')
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        return reply
+        
+    def serve(self, request):
+        #\"\"\"Replica side of every storage call\"\"\"
+        header, body = decode_call(request)
+        key = header['key']
+        if header['op'] == 'store':
+            self.replicas[key] = body
+            return encode_call('stored', key)
+        if header['op'] == 'retrieve':
+            return encode_call('data', key, body=self.replicas[key])
+        if header['op'] == 'update':
+            self.replicas[key] = delta.apply_update(self.replicas.get(key), decode_update(request))
+            return encode_call('stored', key)
+        if header['op'] == 'delta':
+            message = self.manager.serve_delta(self.replicas[key], body)
+            return encode_update('delta', key, message)
+        raise ValueError(f"Unknown storage call {header['op']}")
+        
+    async def store_on_peer(self, peer, key, data):
+        if isinstance(data, str):
+            data = data.encode()
+        await self.call(peer, encode_call('store', key, body=data))
+        return {'peer': peer.id, 'key': key}
+        
+    async def retrieve_from_peer(self, peer, key):
+        _, body = decode_call(await self.call(peer, encode_call('retrieve', key)))
+        return body
+        
+    async def update_on_peer(self, peer, key, message):
+        await self.call(peer, encode_update('update', key, message))
+        return {'peer': peer.id, 'key': key, 'mode': message['type']}
+        
+    async def retrieve_delta_from_peer(self, peer, key, encoded_signature):
+        reply = await self.call(peer, encode_call('delta', key, body=encoded_signature))
+        return decode_update(reply)
+        
+    async def send_update(self, item, message):
+        #\"\"\"SyncManager hook: push an update to every replica of the item\"\"\"
+        key = item['id']
+        entry = self.manager.content_index.get(key)
+        if entry:
+            peers = [self.manager.peers[peer_id] for peer_id in entry['peers']]
+        else:
+            peers = await self.find_storage_peers(self.manager.replication_factor)
+        # Every replica gets the update; a rejection is raised afterwards
+        # so the SyncManager sends the whole object next time
+        failures = []
+        for peer in peers:
+            try:
+                await self.update_on_peer(peer, key, message)
+            except Exception as e:
+                failures.append(e)
+        if failures:
+            raise failures[0]
+
+class MeshSimulator:
+    #\"\"\"In-process radio mesh with per-link bandwidth, latency and loss\"\"\"
+    # Timing runs on a virtual clock: each packet carries its own simulated
+    # time and queues behind earlier traffic on every half-duplex radio it
+    # crosses, so hundreds of nodes simulate in milliseconds of wall time
+    def __init__(self, seed=None, bandwidth=1200, latency=0.05, loss=0.0,
+                 duty_cycle=1.0, window=3600, overhead=20, max_hops=8):
+        self.random = random.Random(seed)
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.loss = loss
+        self.duty_cycle = duty_cycle
+        self.window = window
+        self.overhead = overhead
+        self.max_hops = max_hops
+        self.nodes = {}
+        self.links = {}
+        self.networks = {}
+        self.storage = {}
+        self.flood_ids = itertools.count()
+        self.clock = 0.0
+        self.horizon = 0.0
+        self.latencies = []
+        self.stats = {
+            'sent': 0,
+            'delivered': 0,
+            'lost': 0,
+            'bytes_delivered': 0,
+            'transmissions': 0,
+            'airtime': 0.0,
+            'duty_cycle_waits': 0
+        }
+        
+    def now(self):
+        #\"\"\"Simulated seconds; new traffic starts at this time\"\"\"
+        return self.clock
+        
+    async def advance(self, seconds):
+        #\"\"\"Move the clock forward, e.g. between waves of offered load\"\"\"
+        self.clock += seconds
+        await asyncio.sleep(0)
+        
+    def add_node(self, node_id=None, duty_cycle=None):
+        node_id = node_id or f"node{len(self.nodes)}"
+        interface = SimulatedInterface(
+            self,
+            node_id,
+            self.duty_cycle if duty_cycle is None else duty_cycle
+        )
+        self.nodes[node_id] = interface
+        self.links.setdefault(node_id, {})
+        return interface
+        
+    def connect(self, a, b, bandwidth=None, latency=None, loss=None,
+                rssi=None, snr=None, symmetric=True):
+        link = {
+            'bandwidth': bandwidth or self.bandwidth,
+            'latency': self.latency if latency is None else latency,
+            'loss': self.loss if loss is None else loss,
+            'rssi': rssi,
+            'snr': snr
+        }
+        self.links.setdefault(a, {})[b] = link
+        if symmetric:
+            self.links.setdefault(b, {})[a] = dict(link)
+        return link
+        
+    def disconnect(self, a, b, symmetric=True):
+        self.links.get(a, {}).pop(b, None)
+        if symmetric:
+            self.links.get(b, {}).pop(a, None)
+            
+    def random_topology(self, count, degree=3, **link):
+        #\"\"\"Connected random mesh: a random spanning tree plus extra links\"\"\"
+        ids = [self.add_node().node_id for _ in range(count)]
+        for index in range(1, count):
+            self.connect(ids[index], ids[self.random.randrange(index)], **link)
+            
+        extra = max(count * (degree - 2) // 2, 0)
+        for _ in range(extra * 4):
+            if extra <= 0:
+                break
+            a, b = self.random.sample(ids, 2)
+            if b not in self.links[a]:
+                self.connect(a, b, **link)
+                extra -= 1
+        return ids
+        
+    def path(self, source, destination):
+        #\"\"\"Fewest-hop path, standing in for Reticulum's own path finding\"\"\"
+        parents = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == destination:
+                path = [node]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                return path[::-1]
+            for neighbor in self.links.get(node, {}):
+                if neighbor not in parents:
+                    parents[neighbor] = node
+                    queue.append(neighbor)
+        return None
+        
+    def occupy_radio(self, node_id, size, bandwidth, ready):
+        #\"\"\"Book a node's radio for one packet; returns (start, airtime)\"\"\"
+        interface = self.nodes[node_id]
+        airtime = NetworkUtils.estimate_transmission_time(size + self.overhead, bandwidth)
+        start = max(ready, interface.radio_free)
+        
+        delay = interface.budget.wait_time(airtime, start)
+        if delay > 0:
+            self.stats['duty_cycle_waits'] += 1
+            start += delay
+            
+        interface.budget.record(airtime, start)
+        interface.radio_free = start + airtime
+        self.horizon = max(self.horizon, interface.radio_free)
+        self.stats['transmissions'] += 1
+        self.stats['airtime'] += airtime
+        return start, airtime
+        
+    def delivered(self, link):
+        return self.random.random() >= link['loss']
+        
+    def transmit(self, source, neighbor, size, ready):
+        #\"\"\"One hop; returns (link, airtime, arrival time)\"\"\"
+        link = self.links.get(source, {}).get(neighbor)
+        if link is None:
+            raise PacketLost(f"No link from {source} to {neighbor}")
+            
+        start, airtime = self.occupy_radio(source, size, link['bandwidth'], ready)
+        if not self.delivered(link):
+            raise PacketLost(f"Packet lost between {source} and {neighbor}")
+        return link, airtime, start + airtime + link['latency']
+        
+    async def send(self, source, destination, data, packet_type='data'):
+        if isinstance(destination, (list, tuple)):
+            # Route paths are written from the sender's view
+            path = [source if node == 'local' else node for node in destination]
+        else:
+            path = self.path(source, destination)
+        if not path or len(path) < 2:
+            raise PacketLost(f"No path from {source} to {destination}")
+            
+        self.stats['sent'] += 1
+        started = arrival = self.clock
+        size = payload_size(data)
+        airtime = 0.0
+        link = None
+        try:
+            for a, b in zip(path, path[1:]):
+                link, used, arrival = self.transmit(a, b, size, arrival)
+                airtime += used
+        except PacketLost:
+            self.stats['lost'] += 1
+            raise
+            
+        await self.nodes[path[-1]].deliver(SimulatedPacket(
+            packet_type,
+            data,
+            source,
+            path[-1],
+            len(path) - 2,
+            link['rssi'],
+            link['snr']
+        ))
+        
+        latency = arrival - started
+        self.latencies.append(latency)
+        self.horizon = max(self.horizon, arrival)
+        self.stats['delivered'] += 1
+        self.stats['bytes_delivered'] += size
+        return {
+            'status': 'sent',
+            'hops': len(path) - 1,
+            'latency': latency,
+            'airtime': airtime,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+    async def broadcast(self, source, packet_type, data):
+        #\"\"\"Flood a packet through the mesh, as Reticulum does with announces\"\"\"
+        flood_id = next(self.flood_ids)
+        size = payload_size(data)
+        self.nodes[source].seen.append(flood_id)
+        
+        # Relay in arrival order so each node keeps the earliest copy
+        sequence = itertools.count()
+        events = [(self.clock, next(sequence), source, 0)]
+        while events:
+            ready, _, node_id, hops = heapq.heappop(events)
+            neighbors = self.links.get(node_id, {})
+            if not neighbors:
+                continue
+                
+            # One transmission reaches every neighbor in radio range
+            bandwidth = min(link['bandwidth'] for link in neighbors.values())
+            start, airtime = self.occupy_radio(node_id, size, bandwidth, ready)
+            
+            for neighbor, link in list(neighbors.items()):
+                interface = self.nodes[neighbor]
+                if flood_id in interface.seen or not self.delivered(link):
+                    continue
+                interface.seen.append(flood_id)
+                
+                arrival = start + airtime + link['latency']
+                self.horizon = max(self.horizon, arrival)
+                payload = dict(data, hops=hops) if isinstance(data, dict) else data
+                await interface.deliver(SimulatedPacket(
+                    packet_type,
+                    payload,
+                    node_id,
+                    None,
+                    hops,
+                    link['rssi'],
+                    link['snr']
+                ))
+                if hops + 1 < self.max_hops:
+                    heapq.heappush(events, (arrival, next(sequence), neighbor, hops + 1))
+                    
+    def attach(self, network, node_id=None, duty_cycle=None):
+        #\"\"\"Give a ReticulumMeshNetwork a virtual node as its interface\"\"\"
+        interface = self.nodes.get(node_id) or self.add_node(node_id, duty_cycle)
+        network.interface = interface
+        self.networks[interface.node_id] = network
+        return interface
+        
+    def attach_storage(self, manager, node_id=None, sync=None):
+        #\"\"\"Run a DistributedStorageManager, and optionally its SyncManager, on a virtual node\"\"\"
+        interface = self.nodes.get(node_id) or self.add_node(node_id)
+        adapter = StorageAdapter(self, interface.node_id, manager)
+        self.storage[interface.node_id] = adapter
+        if sync is not None:
+            sync.send_update = adapter.send_update
+        return adapter
+        
+    async def announce_all(self):
+        #\"\"\"Have every attached network announce itself once\"\"\"
+        for network in self.networks.values():
+            await network.announce_presence(network.discovery.build_announcement())
+            # Let the control workers keep up with the flood
+            await network.dispatcher.join()
+        for network in self.networks.values():
+            await network.dispatcher.join()
+            
+    def converge(self):
+        #\"\"\"Load the full link state into every attached routing engine\"\"\"
+        for node_id, network in self.networks.items():
+            local = lambda node: 'local' if node == node_id else node
+            for a, neighbors in self.links.items():
+                for b, link in neighbors.items():
+                    link_metrics = {
+                        name: link[name]
+                        for name in ('bandwidth', 'loss', 'rssi', 'snr')
+                        if link[name] is not None
+                    }
+                    network.routing.set_link(local(a), local(b), symmetric=False, **link_metrics)
+                    
+    def summary(self):
+        elapsed = self.horizon
+        return {
+            'nodes': len(self.nodes),
+            'links': sum(len(neighbors) for neighbors in self.links.values()) // 2,
+            'sent': self.stats['sent'],
+            'delivered': self.stats['delivered'],
+            'lost': self.stats['lost'],
+            'delivery_ratio': self.stats['delivered'] / self.stats['sent'] if self.stats['sent'] else None,
+            'throughput': self.stats['bytes_delivered'] / elapsed if elapsed > 0 else 0.0,
+            'latency_p50': percentile(self.latencies, 0.5),
+            'latency_p95': percentile(self.latencies, 0.95),
+            'latency_p99': percentile(self.latencies, 0.99),
+            'transmissions': self.stats['transmissions'],
+            'airtime': self.stats['airtime'],
+            'duty_cycle_waits': self.stats['duty_cycle_waits']
+        }
\ No newline at end of file
@@ -1,11 +1,147 @@
-from cryptography.fernet import Fernet
-from nacl.public import Box, PrivateKey, PublicKey
+from collections import OrderedDict
+import base64
+import hashlib
+import json
+import logging
 import os
+import struct
+import threading
+from .streams import StreamError
+
+# cryptography and nacl are imported on first use to keep startup fast
+
+logger = logging.getLogger(__name__)
+
+# Stream id, chunk index and final-chunk flag, sealed inside each stream token
+STREAM_HEADER = struct.Struct('>16sQB')
+
+def default_key_path():
+    return os.environ.get(
+        'MESH_KEY_PATH',
+        os.path.join(os.path.expanduser('~'), '.mesh', 'node_key.json')
+    )
+
+class NodeKeyContext:
+    # One set of node keys per key file, shared by every component so data
+    # encrypted by one stays readable by the others and across restarts
+    contexts = {}
+    contexts_lock = threading.Lock()
+    
+    def __init__(self, path=None):
+        self.path = path
+        self.keys = None
+        self.lock = threading.Lock()
+        
+    @classmethod
+    def shared(cls, path=None):
+        path = path or default_key_path()
+        with cls.contexts_lock:
+            context = cls.contexts.get(path)
+            if context is None:
+                context = cls.contexts[path] = cls(path)
+        return context
+        
+    @classmethod
+    def ephemeral(cls):
+        # In-memory keys that are never written to disk
+        return cls(None)
+        
+    def load(self):
+        if self.keys is None:
+            with self.lock:
+                if self.keys is None:
+                    self.keys = self.build(self.read() or self.generate())
+        return self.keys
+        
+    @staticmethod
+    def build(raw):
+        from cryptography.fernet import Fernet
+        from nacl.public import PrivateKey
+        from nacl.signing import SigningKey
+        
+        return {
+            'key': raw['key'],
+            'fernet': Fernet(raw['key']),
+            'private_key': PrivateKey(raw['box_key']),
+            'signing_key': SigningKey(raw['signing_seed'])
+        }
+        
+    def read(self):
+        if not self.path:
+            return None
+        try:
+            with open(self.path) as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+            
+        return {
+            'key': record['fernet_key'].encode(),
+            'box_key': bytes.fromhex(record['box_key']),
+            'signing_seed': bytes.fromhex(record['signing_seed'])
+        }
+        
+    def generate(self):
+        raw = {
+            # Same as Fernet.generate_key()
+            'key': base64.urlsafe_b64encode(os.urandom(32)),
+            'box_key': os.urandom(32),
+            'signing_seed': os.urandom(32)
+        }
+        if self.path:
+            try:
+                return self.write(raw)
+            except OSError as e:
+                logger.warning("Could not persist node keys to %s: %s", self.path, e)
+        return raw
+        
+    def write(self, raw):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'fernet_key': raw['key'].decode(),
+                'box_key': raw['box_key'].hex(),
+                'signing_seed': raw['signing_seed'].hex()
+            }, f)
+            
+        # Linking fails if another process created the file first; its keys win
+        try:
+            os.link(temp_path, self.path)
+        except FileExistsError:
+            return self.read()
+        finally:
+            os.unlink(temp_path)
+        return raw
 
 class CryptoHandler:
-    def __init__(self):
-        self.fernet = Fernet(Fernet.generate_key())
-        self.private_key = PrivateKey.generate()
+    # Parsed Ed25519 verify keys, shared by every handler in the process
+    verify_keys = OrderedDict()
+    max_verify_keys = 1024
+    
+    def __init__(self, context=None):
+        # Keys are loaded from the node's key file only when first used
+        self.context = context or NodeKeyContext.shared()
+        
+    @property
+    def key(self):
+        return self.context.load()['key']
+        
+    @property
+    def fernet(self):
+        return self.context.load()['fernet']
+        
+    @property
+    def private_key(self):
+        return self.context.load()['private_key']
+        
+    @property
+    def signing_key(self):
+        return self.context.load()['signing_key']
         
     def encrypt_data(self, data):
         if isinstance(data, str):
@@ -15,7 +151,107 @@ class CryptoHandler:
     def decrypt_data(self, encrypted_data):
         return self.fernet.decrypt(encrypted_data)
         
+    async def encrypt_stream(self, chunks, stream_id=None):
+        # One token per chunk; the sealed stream id, index and final flag
+        # make chunks spliced in from another stream, reordered, dropped
+        # or truncated fail on decryption
+        stream_id = stream_id or os.urandom(16)
+        index = 0
+        pending = None
+        async for chunk in chunks:
+            if pending is not None:
+                yield self.encrypt_data(STREAM_HEADER.pack(stream_id, index, 0) + pending)
+                index += 1
+            pending = chunk
+        yield self.encrypt_data(STREAM_HEADER.pack(stream_id, index, 1) + (pending or b''))
+        
+    async def decrypt_stream(self, tokens, stream_id=None):
+        # Without an expected id, every chunk must match the first one's
+        index = 0
+        final = False
+        async for token in tokens:
+            if final:
+                raise StreamError("Data after the final chunk")
+            plaintext = self.decrypt_data(token)
+            chunk_stream, number, final = STREAM_HEADER.unpack_from(plaintext)
+            stream_id = stream_id or chunk_stream
+            if chunk_stream != stream_id:
+                raise StreamError("Chunk belongs to another stream")
+            if number != index:
+                raise StreamError(f"Expected chunk {index}, got {number}")
+            index += 1
+            yield plaintext[STREAM_HEADER.size:]
+        if not final:
+            raise StreamError("Stream ended before its final chunk")
+            
+    @staticmethod
+    def content_id(data):
+        if isinstance(data, str):
+            data = data.encode()
+        return hashlib.sha256(data).hexdigest()[:16]
+        
+    @staticmethod
+    def encrypted_size(size):
+        # Fernet: version, timestamp, IV, PKCS7-padded body and HMAC,
+        # all urlsafe-base64 encoded
+        raw = 1 + 8 + 16 + (size // 16 + 1) * 16 + 32
+        return 4 * -(-raw // 3)
+        
+    @classmethod
+    def max_plaintext_size(cls, limit):
+        size = max((limit * 3 // 4 - 57) // 16 * 16 + 15, 0)
+        while size > 0 and cls.encrypted_size(size) > limit:
+            size -= 1
+        return size
+        
     def generate_keypair(self):
+        from nacl.public import PrivateKey
+        
         private_key = PrivateKey.generate()
         public_key = private_key.public_key
-        return private_key, public_key
\ No newline at end of file
+        return private_key, public_key
+        
+    @property
+    def public_signing_key(self):
+        return bytes(self.signing_key.verify_key)
+        
+    def sign_data(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        return self.signing_key.sign(data).signature
+        
+    @classmethod
+    def get_verify_key(cls, public_key):
+        verify_key = cls.verify_keys.get(public_key)
+        if verify_key is None:
+            from nacl.signing import VerifyKey
+            
+            verify_key = VerifyKey(public_key)
+            cls.verify_keys[public_key] = verify_key
+            if len(cls.verify_keys) > cls.max_verify_keys:
+                cls.verify_keys.popitem(last=False)
+        else:
+            cls.verify_keys.move_to_end(public_key)
+        return verify_key
+        
+    @classmethod
+    def verify_signature(cls, public_key, data, signature):
+        from nacl.exceptions import BadSignatureError
+        
+        if isinstance(data, str):
+            data = data.encode()
+        try:
+            cls.get_verify_key(public_key).verify(data, signature)
+            return True
+        except (BadSignatureError, ValueError, TypeError):
+            return False
+            
+    @classmethod
+    def verify_batch(cls, items):
+        # libsodium has no batch Ed25519 API, so amortise what we can:
+        # each distinct key is parsed once and the whole batch is
+        # checked in a single pass
+        return [
+            cls.verify_signature(public_key, data, signature)
+            for public_key, data, signature in items
+        ]
\ No newline at end of file
@@ -0,0 +1,245 @@
+import hashlib
+import math
+from .crypto import CryptoHandler
+
+# rsync-style deltas: the side holding the old version describes it with a
+# rolling checksum per block; the other side answers with copy instructions
+# for blocks it can reuse and literal bytes for everything else
+
+MOD = 1 << 16
+STRONG_SIZE = 8
+COPY = 0
+LITERAL = 1
+
+class DeltaError(Exception):
+    pass
+
+def choose_block_size(length, minimum=64, maximum=4096):
+    #\"\"\"Balance signature size against literal bytes per edit\"\"\"
+    return max(minimum, min(maximum, math.isqrt(length)))
+
+def weak_checksum(block):
+    a = sum(block) % MOD
+    b = sum((len(block) - i) * byte for i, byte in enumerate(block)) % MOD
+    return a, b
+
+def strong_checksum(block):
+    return hashlib.blake2b(block, digest_size=STRONG_SIZE).digest()
+
+def signature(data, block_size=None):
+    #\"\"\"Block checksums of the version the caller already holds\"\"\"
+    block_size = block_size or choose_block_size(len(data))
+    blocks = []
+    for offset in range(0, len(data), block_size):
+        block = data[offset:offset + block_size]
+        a, b = weak_checksum(block)
+        blocks.append((a | (b << 16), strong_checksum(block)))
+    return {
+        'block_size': block_size,
+        'length': len(data),
+        'digest': CryptoHandler.content_id(data),
+        'blocks': blocks
+    }
+
+def delta(base_signature, data):
+    #\"\"\"Copy/literal instructions that turn the signed version into data\"\"\"
+    block_size = base_signature['block_size']
+    blocks = base_signature['blocks']
+    # The last block may be short; it can only match at the end of data
+    tail_size = base_signature['length'] - (len(blocks) - 1) * block_size if blocks else 0
+    
+    index = {}
+    for number, (weak, strong) in enumerate(blocks):
+        if number == len(blocks) - 1 and tail_size != block_size:
+            continue
+        index.setdefault(weak, []).append((strong, number))
+        
+    ops = []
+    literal_start = 0
+    offset = 0
+    length = len(data)
+    a = b = None
+    
+    def emit_literal(end):
+        if end > literal_start:
+            ops.append((LITERAL, data[literal_start:end]))
+            
+    def emit_copy(number):
+        if ops and ops[-1][0] == COPY and ops[-1][1] + ops[-1][2] == number:
+            ops[-1] = (COPY, ops[-1][1], ops[-1][2] + 1)
+        else:
+            ops.append((COPY, number, 1))
+            
+    while index and offset + block_size <= length:
+        if a is None:
+            a, b = weak_checksum(data[offset:offset + block_size])
+            
+        candidates = index.get(a | (b << 16))
+        if candidates:
+            strong = strong_checksum(data[offset:offset + block_size])
+            match = next((number for digest, number in candidates if digest == strong), None)
+            if match is not None:
+                emit_literal(offset)
+                emit_copy(match)
+                offset += block_size
+                literal_start = offset
+                a = None
+                continue
+                
+        # Roll the window forward by one byte
+        outgoing = data[offset]
+        if offset + block_size < length:
+            incoming = data[offset + block_size]
+            a = (a - outgoing + incoming) % MOD
+            b = (b - block_size * outgoing + a) % MOD
+        offset += 1
+        
+    # A short final block can still be reused when data ends the same way
+    if blocks and tail_size != block_size and length - literal_start >= tail_size > 0:
+        tail = data[length - tail_size:]
+        if strong_checksum(tail) == blocks[-1][1]:
+            emit_literal(length - tail_size)
+            emit_copy(len(blocks) - 1)
+            literal_start = length
+            
+    emit_literal(length)
+    return ops
+
+def patch(base, ops, block_size):
+    #\"\"\"Rebuild the new version from the old one and a delta\"\"\"
+    parts = []
+    for op in ops:
+        if op[0] == COPY:
+            start = op[1] * block_size
+            end = min(start + op[2] * block_size, len(base))
+            if start >= len(base):
+                raise DeltaError(f"Copy of block {op[1]} is past the end of the base")
+            parts.append(base[start:end])
+        else:
+            parts.append(op[1])
+    return b''.join(parts)
+
+def encode_varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def decode_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise DeltaError("Truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+def encode_delta(ops):
+    out = bytearray()
+    for op in ops:
+        if op[0] == COPY:
+            out += bytes([COPY]) + encode_varint(op[1]) + encode_varint(op[2])
+        else:
+            out += bytes([LITERAL]) + encode_varint(len(op[1])) + op[1]
+    return bytes(out)
+
+def decode_delta(data):
+    ops = []
+    offset = 0
+    while offset < len(data):
+        kind = data[offset]
+        offset += 1
+        if kind == COPY:
+            number, offset = decode_varint(data, offset)
+            count, offset = decode_varint(data, offset)
+            ops.append((COPY, number, count))
+        elif kind == LITERAL:
+            size, offset = decode_varint(data, offset)
+            if offset + size > len(data):
+                raise DeltaError("Truncated literal")
+            ops.append((LITERAL, data[offset:offset + size]))
+            offset += size
+        else:
+            raise DeltaError(f"Unknown delta op {kind}")
+    return ops
+
+def encode_signature(sig):
+    #\"\"\"Compact wire form: 12 bytes per block\"\"\"
+    out = bytearray()
+    out += encode_varint(sig['block_size']) + encode_varint(sig['length'])
+    out += bytes.fromhex(sig['digest'])
+    for weak, strong in sig['blocks']:
+        out += weak.to_bytes(4, 'big') + strong
+    return bytes(out)
+
+def decode_signature(data):
+    block_size, offset = decode_varint(data, 0)
+    length, offset = decode_varint(data, offset)
+    digest = data[offset:offset + 8].hex()
+    offset += 8
+    
+    entry = 4 + STRONG_SIZE
+    if (len(data) - offset) % entry or not block_size:
+        raise DeltaError("Malformed signature")
+    blocks = [
+        (int.from_bytes(data[i:i + 4], 'big'), data[i + 4:i + entry])
+        for i in range(offset, len(data), entry)
+    ]
+    return {
+        'block_size': block_size,
+        'length': length,
+        'digest': digest,
+        'blocks': blocks
+    }
+
+def make_update(base_signature, data):
+    #\"\"\"Delta message against the signed version, or the full object\"\"\"
+    if isinstance(data, str):
+        data = data.encode()
+    digest = CryptoHandler.content_id(data)
+    
+    if base_signature:
+        encoded = encode_delta(delta(base_signature, data))
+        # Fall back to the full object when the delta would not be smaller
+        if len(encoded) < len(data):
+            return {
+                'type': 'delta',
+                'base': base_signature['digest'],
+                'block_size': base_signature['block_size'],
+                'digest': digest,
+                'size': len(data),
+                'delta': encoded
+            }
+            
+    return {
+        'type': 'full',
+        'digest': digest,
+        'size': len(data),
+        'data': data
+    }
+
+def apply_update(base, message):
+    #\"\"\"Apply a make_update message; the result is checked against its digest\"\"\"
+    if message['type'] == 'full':
+        data = message['data']
+    else:
+        if base is None or CryptoHandler.content_id(base) != message['base']:
+            raise DeltaError("Delta was made against a different base version")
+        data = patch(base, decode_delta(message['delta']), message['block_size'])
+        
+    if CryptoHandler.content_id(data) != message['digest']:
+        raise DeltaError("Patched object does not match its digest")
+    return data
+
+def update_size(message):
+    #\"\"\"Payload bytes an update puts on the wire\"\"\"
+    return len(message['delta'] if message['type'] == 'delta' else message['data'])
\ No newline at end of file
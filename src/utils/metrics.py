@@ -0,0 +1,253 @@
+import asyncio
+import contextvars
+import functools
+import itertools
+import os
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Upper bounds in seconds; suited to LoRa-scale latencies
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+current_span = contextvars.ContextVar('current_span', default=None)
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+class Span:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.parent = None
+        self.trace_id = None
+        self.span_id = None
+        self.started = None
+        self.token = None
+        
+    def __enter__(self):
+        self.parent = current_span.get()
+        self.trace_id = self.parent.trace_id if self.parent else next(self.registry.ids)
+        self.span_id = next(self.registry.ids)
+        self.token = current_span.set(self)
+        self.started = time.perf_counter()
+        return self
+        
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        current_span.reset(self.token)
+        self.registry.observe(f"{self.name}_seconds", duration, **self.labels)
+        if exc_type is not None:
+            self.registry.inc(f"{self.name}_errors_total", **self.labels)
+        self.registry.record_span(self, duration, exc)
+        return False
+        
+    async def __aenter__(self):
+        return self.__enter__()
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+class NoopSpan:
+    # Shared by every span while metrics are disabled
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc, tb):
+        return False
+        
+    async def __aenter__(self):
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+NOOP_SPAN = NoopSpan()
+
+class MetricsRegistry:
+    #\"\"\"Counters, gauges, histograms and spans with Prometheus text export\"\"\"
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS, max_spans=1024):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.descriptions = {}
+        self.spans = deque(maxlen=max_spans)
+        self.ids = itertools.count(1)
+        self.server = None
+        
+    def enable(self):
+        self.enabled = True
+        
+    def disable(self):
+        self.enabled = False
+        
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+        self.spans.clear()
+        
+    def describe(self, name, text):
+        self.descriptions[name] = text
+        
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+        
+    def set(self, name, value, **labels):
+        if not self.enabled:
+            return
+        self.gauges[(name, label_key(labels))] = value
+        
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = {
+                'buckets': [0] * len(self.buckets),
+                'sum': 0.0,
+                'count': 0
+            }
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            histogram['buckets'][index] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+        
+    def span(self, name, **labels):
+        #\"\"\"Time a block; nested spans share a trace id\"\"\"
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, labels)
+        
+    def timed(self, name, **labels):
+        #\"\"\"Run a coroutine function inside a span\"\"\"
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                with Span(self, name, labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+        
+    def record_span(self, span, duration, error=None):
+        self.spans.append({
+            'name': span.name,
+            'labels': span.labels,
+            'trace_id': span.trace_id,
+            'span_id': span.span_id,
+            'parent_id': span.parent.span_id if span.parent else None,
+            'duration': duration,
+            'error': repr(error) if error is not None else None
+        })
+        
+    def value(self, name, **labels):
+        key = (name, label_key(labels))
+        return self.counters.get(key, self.gauges.get(key))
+        
+    def summary(self, name, **labels):
+        histogram = self.histograms.get((name, label_key(labels)))
+        if not histogram:
+            return None
+        return {
+            'count': histogram['count'],
+            'sum': histogram['sum'],
+            'mean': histogram['sum'] / histogram['count']
+        }
+        
+    def render_prometheus(self):
+        #\"\"\"Render all metrics in the Prometheus text exposition format\"\"\"
+        lines = []
+        
+        def header(name, kind):
+            if name in self.descriptions:
+                lines.append(f"# HELP {name} {self.descriptions[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            
+        for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+            names = sorted({name for name, _ in series})
+            for name in names:
+                header(name, kind)
+                for (series_name, labels), value in sorted(series.items(), key=str):
+                    if series_name == name:
+                        lines.append(f"{name}{format_labels(labels)} {value}")
+                        
+        for name in sorted({name for name, _ in self.histograms}):
+            header(name, 'histogram')
+            for (series_name, labels), histogram in sorted(self.histograms.items(), key=str):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+                
+        return '\n'.join(lines) + '\n'
+        
+    def write_file(self, path):
+        # Write then rename so scrapers never read a partial file
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, path)
+        
+    async def export_periodically(self, path, interval=15):
+        while True:
+            self.write_file(path)
+            await asyncio.sleep(interval)
+            
+    async def serve(self, host='127.0.0.1', port=9464):
+        #\"\"\"Serve /metrics over HTTP for a local Prometheus scraper\"\"\"
+        async def handle(reader, writer):
+            try:
+                request = await reader.readline()
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                    
+                parts = request.split()
+                if len(parts) > 1 and parts[1] == b'/metrics':
+                    status, body = '200 OK', self.render_prometheus().encode()
+                else:
+                    status, body = '404 Not Found', b'Not found\n'
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    f"Content-Type: text/plain; version=0.0.4\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: close\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+            finally:
+                writer.close()
+                
+        self.server = await asyncio.start_server(handle, host, port)
+        return self.server
+        
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+# Process-wide registry; off unless MESH_METRICS is set or enable() is called
+metrics = MetricsRegistry(enabled=os.environ.get('MESH_METRICS', '0') not in ('', '0'))
\ No newline at end of file
@@ -14,10 +14,8 @@ class NetworkUtils:
         #\"\"\"Optimize packet size based on MTU\"\"\"
         if data_size <= mtu:
             return data_size
-        
-        # Find optimal packet size
-        packet_size = mtu
-        while data_size % packet_size != 0 and packet_size > 1:
-            packet_size -= 1
             
-        return packet_size
\ No newline at end of file
+        # Airtime is driven by the number of fragments, not divisibility:
+        # use the fewest that fit and spread the payload evenly over them
+        fragments = -(-data_size // mtu)
+        return -(-data_size // fragments)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import asyncio
+import struct
+
+# Streams are async iterators of bytes; every stage holds at most a few
+# chunks so large objects move under a fixed memory ceiling
+
+CHUNK_SIZE = 64 * 1024
+FRAME_LENGTH = struct.Struct('>I')
+
+class StreamError(Exception):
+    pass
+
+async def iterate(source):
+    #\"\"\"Accept bytes, a sync iterable or an async iterable of bytes\"\"\"
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield bytes(source)
+    elif hasattr(source, '__aiter__'):
+        async for chunk in source:
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+async def rechunk(source, size=CHUNK_SIZE):
+    #\"\"\"Re-slice a stream into chunks of exactly size bytes, bar the last\"\"\"
+    buffer = bytearray()
+    async for chunk in iterate(source):
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        buffer += chunk
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+async def read_file(path, chunk_size=CHUNK_SIZE, offset=0):
+    #\"\"\"Stream a file from disk without blocking the event loop\"\"\"
+    loop = asyncio.get_running_loop()
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def frame(data):
+    return FRAME_LENGTH.pack(len(data)) + data
+
+async def read_frames(path, limit):
+    #\"\"\"Length-prefixed records written with frame()\"\"\"
+    loop = asyncio.get_running_loop()
+    with open(path, 'rb') as f:
+        while True:
+            header = await loop.run_in_executor(None, f.read, FRAME_LENGTH.size)
+            if not header:
+                return
+            if len(header) < FRAME_LENGTH.size:
+                raise StreamError("Truncated frame header")
+                
+            (length,) = FRAME_LENGTH.unpack(header)
+            if length > limit:
+                raise StreamError(f"Frame of {length} bytes exceeds {limit}")
+            data = await loop.run_in_executor(None, f.read, length)
+            if len(data) < length:
+                raise StreamError("Truncated frame")
+            yield data
+
+async def collect(source):
+    #\"\"\"Join a stream into one bytes object; for small objects and tests\"\"\"
+    return b''.join([chunk async for chunk in iterate(source)])
\ No newline at end of file
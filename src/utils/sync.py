@@ -1,20 +1,85 @@
 import asyncio
+import logging
 from datetime import datetime
+from . import delta
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 class SyncManager:
-    def __init__(self):
+    def __init__(self, send_update=None, delta_mode=True, block_size=None,
+                 load_data=None):
         self.sync_queue = asyncio.Queue()
         self.last_sync = {}
+        self.send_update = send_update
+        # Reads an item's current content when it is synced, so queued
+        # items stay small
+        self.load_data = load_data
+        self.delta_mode = delta_mode
+        self.block_size = block_size
+        # Block signatures of the last version sent for each item
+        self.signatures = {}
+        self.stats = {
+            'updates': 0,
+            'delta_updates': 0,
+            'bytes_sent': 0,
+            'bytes_full': 0
+        }
         
     async def queue_sync(self, item):
         await self.sync_queue.put(item)
+        metrics.set('sync_queue_depth', self.sync_queue.qsize())
         
     async def process_queue(self):
         while True:
             item = await self.sync_queue.get()
-            await self.sync_item(item)
-            self.sync_queue.task_done()
-            
+            metrics.set('sync_queue_depth', self.sync_queue.qsize())
+            try:
+                await self.sync_item(item)
+            except Exception as e:
+                logger.warning("Failed to sync %s: %s", item.get('id'), e)
+            finally:
+                self.sync_queue.task_done()
+                
+    @metrics.timed('sync_item')
     async def sync_item(self, item):
+        # Item content is sent as a delta where possible
+        data = item.get('data')
+        if data is None and self.load_data and self.send_update:
+            data = await self.load_data(item['id'])
+        if data is not None and self.send_update:
+            message = self.prepare_update(item['id'], data)
+            try:
+                await self.send_update(item, message)
+            except Exception:
+                # The peer may not hold our base any more; send it whole next time
+                self.reset_item(item['id'])
+                raise
+            self.commit_update(item['id'], data)
+            
+            sent = delta.update_size(message)
+            self.stats['updates'] += 1
+            self.stats['delta_updates'] += message['type'] == 'delta'
+            self.stats['bytes_sent'] += sent
+            self.stats['bytes_full'] += message['size']
+            metrics.inc('sync_bytes_sent_total', sent, mode=message['type'])
+            metrics.inc('sync_bytes_saved_total', message['size'] - sent)
+            
         self.last_sync[item['id']] = datetime.now()
-        # Implement sync logic here
\ No newline at end of file
+        
+    def prepare_update(self, item_id, data):
+        #\"\"\"Delta against the last version synced for this item\"\"\"
+        base = self.signatures.get(item_id) if self.delta_mode else None
+        return delta.make_update(base, data)
+        
+    def commit_update(self, item_id, data):
+        if self.delta_mode:
+            self.signatures[item_id] = delta.signature(data, self.block_size)
+            
+    def reset_item(self, item_id):
+        #\"\"\"Forget the synced version, e.g. after a peer rejected a delta\"\"\"
+        self.signatures.pop(item_id, None)
+        
+    def apply_update(self, base, message):
+        #\"\"\"Receiving side: rebuild the new version from the local copy\"\"\"
+        return delta.apply_update(base, message)
\ No newline at end of file
@@ -1,9 +1,13 @@
 import asyncio
+import logging
 from datetime import datetime
 from ..storage.remote_storage import RemoteStorageSystem
 from ..transport.secure_transport import SecureReticulumTransport
+from ..utils.metrics import metrics
 from .renderer import WebRenderer
 
+logger = logging.getLogger(__name__)
+
 class DecentralizedBrowser:
     def __init__(self):
         self.storage = RemoteStorageSystem()
@@ -12,6 +16,7 @@ class DecentralizedBrowser:
         self.cache = BrowserCache()
         self.history = []
         
+    @metrics.timed('web_load_site')
     async def load_site(self, site_id):
         #\"\"\"Load and render website\"\"\"
         try:
@@ -35,7 +40,8 @@ class DecentralizedBrowser:
             return rendered
             
         except Exception as e:
-            print(f"Error loading site: {e}")
+            logger.warning("Error loading site %s: %s", site_id, e)
+            metrics.inc('web_site_load_errors_total')
             # Try loading from cache
             return await self.load_cached_site(site_id)
             
@@ -78,7 +84,8 @@ class DecentralizedBrowser:
                     'content': resource_data['data']
                 }
             except Exception as e:
-                print(f"Error loading resource {path}: {e}")
+                logger.warning("Error loading resource %s: %s", path, e)
+                metrics.inc('web_resource_errors_total')
                 
         return resources
         
@@ -108,6 +115,7 @@ class BrowserCache:
     async def get_site(self, site_id):
         #\"\"\"Get site from cache\"\"\"
         cached = self.cache.get(site_id)
+        metrics.inc('web_cache_requests_total', result='hit' if cached else 'miss')
         if not cached:
             return None
             
@@ -119,6 +127,7 @@ class BrowserCache:
             # Remove oldest entry
             oldest = min(self.cache.items(), key=lambda x: x[1]['timestamp'])
             del self.cache[oldest[0]]
+            metrics.inc('web_cache_evictions_total')
             
     def get_cache_size(self):
         #\"\"\"Calculate current cache size\"\"\"
@@ -1,8 +1,59 @@
 import asyncio
+import hashlib
 import json
+import mimetypes
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from ..storage.remote_storage import RemoteStorageSystem
 from ..transport.secure_transport import SecureReticulumTransport
+from ..utils.crypto import CryptoHandler
+from ..utils import streams
+
+PAGE_TYPES = {
+    '.html': 'html',
+    '.htm': 'html',
+    '.md': 'markdown',
+    '.markdown': 'markdown',
+    '.txt': 'text'
+}
+
+def prepare_content(data, key, compress_level=6):
+    #\"\"\"Hash, compress and encrypt one object\"\"\"
+    # Module level so it can run in worker processes
+    from cryptography.fernet import Fernet
+    
+    if isinstance(data, str):
+        data = data.encode()
+        
+    compressed = zlib.compress(data, compress_level) if compress_level else data
+    is_compressed = len(compressed) < len(data)
+    
+    return {
+        'content_id': CryptoHandler.content_id(data),
+        'size': len(data),
+        'compressed': is_compressed,
+        'encrypted': True,
+        'data': Fernet(key).encrypt(compressed if is_compressed else data)
+    }
+
+def prepare_file(path, key, compress_level=6):
+    with open(path, 'rb') as f:
+        return prepare_content(f.read(), key, compress_level)
+
+def hash_file(path, chunk_size=streams.CHUNK_SIZE):
+    #\"\"\"Content id and size of a file, read a chunk at a time\"\"\"
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return {
+        'content_id': digest.hexdigest()[:16],
+        'size': size
+    }
 
 class ContentManager:
     def __init__(self):
@@ -11,20 +62,28 @@ class ContentManager:
         self.content_index = {}
         self.site_manifests = {}
         
-    async def publish_site(self, site_data):
+    async def publish_site(self, site_data, executor=None):
         #\"\"\"Publish website to the mesh network\"\"\"
         # Generate site ID
         site_id = self.generate_site_id(site_data)
         
-        # Process and store resources
-        resources = await self.process_resources(site_data.get('resources', {}))
-        
+        # Pages and resources share one process pool
+        owns_executor = executor is None
+        executor = executor or ProcessPoolExecutor()
+        try:
+            # Process and store resources
+            resources = await self.process_resources(site_data.get('resources', {}), executor)
+            pages = await self.process_pages(site_data.get('pages', {}), executor)
+        finally:
+            if owns_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                
         # Create site manifest
         manifest = {
             'site_id': site_id,
             'created_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat(),
-            'pages': await self.process_pages(site_data.get('pages', {})),
+            'pages': pages,
             'resources': resources,
             'metadata': site_data.get('metadata', {})
         }
@@ -44,54 +103,174 @@ class ContentManager:
             'manifest': manifest
         }
         
-    async def process_pages(self, pages):
+    async def process_pages(self, pages, executor=None):
         #\"\"\"Process and store page content\"\"\"
-        processed_pages = {}
-        
-        for path, content in pages.items():
-            # Store page content
-            page_id = self.generate_content_id(content)
-            stored = await self.storage.store_data(
-                f"/content/{page_id}",
-                content['content'],
-                {
-                    'encrypt': True,
-                    'type': content.get('type', 'html')
-                }
-            )
-            
-            processed_pages[path] = {
-                'id': page_id,
-                'type': content.get('type', 'html'),
-                'storage_path': stored['path']
-            }
-            
-        return processed_pages
+        return await self.process_items(pages, '/content', 'html', executor)
         
-    async def process_resources(self, resources):
+    async def process_resources(self, resources, executor=None):
         #\"\"\"Process and store site resources\"\"\"
-        processed_resources = {}
-        
-        for path, resource in resources.items():
-            # Store resource
-            resource_id = self.generate_content_id(resource)
-            stored = await self.storage.store_data(
-                f"/resources/{resource_id}",
-                resource['content'],
-                {
-                    'encrypt': True,
-                    'type': resource.get('type', 'binary')
-                }
-            )
-            
-            processed_resources[path] = {
-                'id': resource_id,
-                'type': resource.get('type', 'binary'),
-                'storage_path': stored['path']
+        return await self.process_items(resources, '/resources', 'binary', executor)
+        
+    async def process_items(self, items, prefix, default_type, executor=None):
+        #\"\"\"Prepare items concurrently and store them in one batch\"\"\"
+        if not items:
+            return {}
+        loop = asyncio.get_running_loop()
+        key = self.storage.crypto.key
+        owns_executor = executor is None
+        executor = executor or ProcessPoolExecutor()
+        try:
+            prepared = await asyncio.gather(*[
+                loop.run_in_executor(executor, prepare_content, item['content'], key)
+                for item in items.values()
+            ])
+        finally:
+            if owns_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                
+        processed = {}
+        records = {}
+        for (path, item), record in zip(items.items(), prepared):
+            storage_path = f"{prefix}/{record['content_id']}"
+            processed[path] = {
+                'id': record['content_id'],
+                'type': item.get('type', default_type),
+                'storage_path': storage_path
             }
+            records[storage_path] = dict(record, path=storage_path)
             
-        return processed_resources
+        if records:
+            await self.storage.store_batch(list(records.values()))
+        return processed
+        
+    async def publish_directory(self, root, metadata=None, workers=None,
+                                batch_size=64, batch_bytes=4 * 1024 * 1024,
+                                stream_threshold=1024 * 1024, executor=None):
+        #\"\"\"Publish a site directory from disk through a process pool\"\"\"
+        metadata = metadata or {}
+        site_id = self.generate_site_id({
+            'title': metadata.get('title', os.path.basename(os.path.abspath(root)))
+        })
+        
+        loop = asyncio.get_running_loop()
+        key = self.storage.crypto.key
+        owns_executor = executor is None
+        executor = executor or ProcessPoolExecutor(max_workers=workers)
         
+        # Bound the work in flight so memory stays flat however big the site
+        window = (workers or os.cpu_count() or 1) * 4
+        in_flight = set()
+        batch = []
+        pending_bytes = 0
+        stored = set()
+        pages = {}
+        resources = {}
+        stats = {'files': 0, 'bytes': 0, 'stored': 0}
+        
+        async def prepare(rel_path, full_path):
+            # Large files are only hashed here and streamed to storage
+            # later, so no worker or batch ever holds them whole
+            if os.path.getsize(full_path) > stream_threshold:
+                record = await loop.run_in_executor(executor, hash_file, full_path)
+            else:
+                record = await loop.run_in_executor(executor, prepare_file, full_path, key)
+            return rel_path, full_path, record
+            
+        async def collect(tasks):
+            nonlocal pending_bytes
+            for task in tasks:
+                rel_path, full_path, record = task.result()
+                site_path = '/' + rel_path
+                page_type = PAGE_TYPES.get(os.path.splitext(rel_path)[1].lower())
+                prefix = '/content' if page_type else '/resources'
+                storage_path = f"{prefix}/{record['content_id']}"
+                
+                entry = {
+                    'id': record['content_id'],
+                    'type': page_type or mimetypes.guess_type(rel_path)[0] or 'binary',
+                    'storage_path': storage_path
+                }
+                (pages if page_type else resources)[site_path] = entry
+                stats['files'] += 1
+                stats['bytes'] += record['size']
+                
+                # Identical files are stored once
+                if storage_path in stored:
+                    continue
+                stored.add(storage_path)
+                if 'data' not in record:
+                    await self.storage.store_stream(storage_path, streams.read_file(full_path))
+                    stats['stored'] += 1
+                    continue
+                batch.append(dict(record, path=storage_path))
+                pending_bytes += len(record['data'])
+                
+            if len(batch) >= batch_size or pending_bytes >= batch_bytes:
+                await flush()
+                
+        async def flush():
+            nonlocal pending_bytes
+            if batch:
+                await self.storage.store_batch(list(batch))
+                stats['stored'] += len(batch)
+                batch.clear()
+                pending_bytes = 0
+                
+        try:
+            for rel_path, full_path in self.walk_site(root):
+                if len(in_flight) >= window:
+                    done, in_flight = await asyncio.wait(
+                        in_flight,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    await collect(done)
+                in_flight.add(asyncio.ensure_future(prepare(rel_path, full_path)))
+                
+            if in_flight:
+                done, _ = await asyncio.wait(in_flight)
+                await collect(done)
+            await flush()
+        finally:
+            if owns_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                
+        manifest = {
+            'site_id': site_id,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat(),
+            'pages': pages,
+            'resources': resources,
+            'metadata': metadata
+        }
+        
+        await self.storage.store_data(
+            f"/sites/{site_id}/manifest.json",
+            json.dumps(manifest),
+            {'encrypt': True}
+        )
+        self.site_manifests[site_id] = manifest
+        
+        return {
+            'site_id': site_id,
+            'manifest': manifest,
+            'stats': stats
+        }
+        
+    def walk_site(self, root):
+        #\"\"\"Yield (relative path, full path) for every file, lazily\"\"\"
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        rel_path = os.path.relpath(entry.path, root)
+                        yield rel_path.replace(os.sep, '/'), entry.path
+                        
     def generate_site_id(self, site_data):
         #\"\"\"Generate unique site ID\"\"\"
         import hashlib
@@ -103,5 +282,7 @@ class ContentManager:
         
     def generate_content_id(self, content):
         #"\"\"Generate unique content ID\"\"\"
-        import hashlib
-        return hashlib.sha256(str(content).encode()).hexdigest()[:16]
\ No newline at end of file
+        # Hash the raw bytes so any peer holding a copy can verify it
+        if isinstance(content, dict):
+            content = content['content']
+        return CryptoHandler.content_id(content)
\ No newline at end of file
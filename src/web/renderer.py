@@ -1,6 +1,7 @@
 import asyncio
-from bs4 import BeautifulSoup
-import markdown2
+from ..utils.metrics import metrics
+
+# bs4 and markdown2 are imported on first render to keep startup fast
 
 class WebRenderer:
     def __init__(self):
@@ -10,6 +11,7 @@ class WebRenderer:
             'text': self.process_text
         }
         
+    @metrics.timed('web_render')
     async def render(self, content, resources=None):
         #\"\"\"Render content based on type\"\"\"
         content_type = content.get('type', 'html')
@@ -32,6 +34,8 @@ class WebRenderer:
         if isinstance(content, bytes):
             content = content.decode('utf-8')
             
+        from bs4 import BeautifulSoup
+        
         # Parse HTML
         soup = BeautifulSoup(content, 'html.parser')
         
@@ -45,6 +49,8 @@ class WebRenderer:
         if isinstance(content, bytes):
             content = content.decode('utf-8')
             
+        import markdown2
+        
         # Convert to HTML
         html = markdown2.markdown(content)
         
@@ -74,8 +80,22 @@ class WebRenderer:
         for style in soup.find_all('link', rel='stylesheet'):
             await self.process_style(style)
             
+    async def process_image(self, img):
+        #\"\"\"Hook for image elements; served as-is by default\"\"\"
+        return img
+        
+    async def process_link(self, link):
+        #\"\"\"Hook for anchor elements; served as-is by default\"\"\"
+        return link
+        
+    async def process_style(self, style):
+        #\"\"\"Hook for stylesheet links; served as-is by default\"\"\"
+        return style
+        
     async def inject_resources(self, content, resources):
         #\"\"\"Inject resources into content\"\"\"
+        from bs4 import BeautifulSoup
+        
         soup = BeautifulSoup(content, 'html.parser')
         
         # Inject styles
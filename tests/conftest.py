@@ -0,0 +1,8 @@
+import pytest
+from src.utils.crypto import NodeKeyContext
+
+@pytest.fixture(autouse=True)
+def node_keys(tmp_path, monkeypatch):
+    # Tests get throwaway node keys, never the developer's ~/.mesh identity
+    monkeypatch.setenv('MESH_KEY_PATH', str(tmp_path / 'node_key.json'))
+    monkeypatch.setattr(NodeKeyContext, 'contexts', {})
\ No newline at end of file
@@ -1,6 +1,10 @@
 import pytest
 import asyncio
+from datetime import timedelta
+from nacl.signing import SigningKey
 from src.auth import ReticulumAuth, StorageAuth
+from src.auth.reticulum_auth import AuthenticationError
+from src.auth.auth_batch import pack_entries, AUTH_BATCH_REQUEST, AUTH_BATCH_RESPONSE
 
 @pytest.mark.asyncio
 async def test_reticulum_auth():
@@ -9,7 +13,8 @@ async def test_reticulum_auth():
     # Test authentication
     result = await auth.authenticate(
         user_id="test_user",
-        scope="site:read"
+        scope="site:read",
+        signing_key=SigningKey.generate()
     )
     
     assert result is not None
@@ -50,4 +55,212 @@ async def test_invalid_token():
     
     # Test invalid token
     verified = await auth.verify_token("invalid_token")
-    assert verified is False
\ No newline at end of file
+    assert verified is False
+
+@pytest.mark.asyncio
+async def test_storage_auth_prefix_grant():
+    auth = StorageAuth()
+    
+    # Test subtree authorization
+    result = await auth.authorize_access(
+        user_id="test_user",
+        path="/sites/abc/",
+        mode="write"
+    )
+    
+    assert await auth.validate_access(result['token'], "/sites/abc/index.html", "write") is True
+    assert await auth.validate_access(result['token'], "/sites/abc/css/style.css", "read") is True
+    assert await auth.validate_access(result['token'], "/sites/abcd/index.html", "read") is False
+    assert await auth.validate_access(result['token'], "/sites", "read") is False
+    
+    # Paths cannot climb out of the granted subtree
+    assert await auth.validate_access(result['token'], "/sites/abc/../xyz/secret", "write") is False
+    assert await auth.validate_access(result['token'], "/sites/abc/./index.html", "read") is False
+    assert await auth.validate_access(result['token'], "/sites/abc/../../etc/passwd", "read") is False
+    assert await auth.validate_access(result['token'], "/sites//abc/index.html", "read") is True
+    with pytest.raises(ValueError):
+        await auth.authorize_access(user_id="test_user", path="/sites/../", mode="write")
+
+@pytest.mark.asyncio
+async def test_storage_auth_manifest_batch():
+    auth = StorageAuth()
+    manifest = {
+        'site_id': 'abc',
+        'pages': {'/index.html': {'storage_path': '/content/p1'}},
+        'resources': {
+            f'/img/{i}.png': {'storage_path': f'/resources/r{i}'}
+            for i in range(50)
+        }
+    }
+    
+    # Test one token covering the whole manifest
+    result = await auth.authorize_manifest("test_user", manifest)
+    paths = ['/sites/abc/manifest.json', '/content/p1'] + [
+        f'/resources/r{i}' for i in range(50)
+    ]
+    
+    valid = await auth.validate_batch(result['token'], paths, "read")
+    assert all(valid.values())
+    assert await auth.validate_access(result['token'], "/content/p1", "write") is False
+    assert await auth.validate_access(result['token'], "/resources/other", "read") is False
+    
+    # Test bulk expiry
+    expired = auth.expire_permissions(now=result['expires_at'] + timedelta(seconds=1))
+    assert expired == 1
+    assert auth.trie.root['children'] == {}
+    assert await auth.validate_access(result['token'], "/content/p1", "read") is False
+
+@pytest.mark.asyncio
+async def test_verification_cache():
+    auth = StorageAuth()
+    result = await auth.authorize_access("test_user", "/test/path", "read")
+    
+    # Test positive caching and revocation
+    assert await auth.validate_access(result['token'], "/test/path", "read") is True
+    assert await auth.validate_access(result['token'], "/test/path", "read") is True
+    assert auth.cache.stats['hits'] == 1
+    
+    await auth.revoke_access(result['token'])
+    assert await auth.validate_access(result['token'], "/test/path", "read") is False
+    
+    # Test negative caching and rate limiting of replayed tokens
+    for _ in range(auth.cache.failure_limit + 2):
+        assert await auth.validate_access("forged", "/test/path", "read") is False
+    assert auth.cache.is_rate_limited("forged") is True
+    assert auth.cache.stats['negative_hits'] > 0
+
+@pytest.mark.asyncio
+async def test_challenge_response_rejects_wrong_key():
+    auth = ReticulumAuth()
+    owner = SigningKey.generate()
+    await auth.authenticate("test_user", "site:read", signing_key=owner)
+    
+    # Test identity bound to a different key
+    with pytest.raises(AuthenticationError):
+        await auth.authenticate("test_user", "site:read", signing_key=SigningKey.generate())
+        
+    # Test forged challenge response
+    request = auth.create_auth_request(owner, "test_user", "site:read")
+    challenge = await auth.handle_auth_request(request)
+    response = auth.solve_challenge(SigningKey.generate(), request, challenge)
+    with pytest.raises(AuthenticationError):
+        await auth.complete_challenge(response)
+
+@pytest.mark.asyncio
+async def test_batch_authentication():
+    auth = ReticulumAuth()
+    clients = [SigningKey.generate() for _ in range(24)]
+    
+    # Gateway packs every client's request into shared packets
+    requests = [
+        auth.create_batch_request(key, f"handheld-{i}", "storage:read")
+        for i, key in enumerate(clients)
+    ]
+    requests[1] = auth.create_batch_request(clients[1], "h" * 60, "storage:read")
+    request_packets = pack_entries(AUTH_BATCH_REQUEST, [entry for _, entry in requests])
+    assert len(request_packets) < len(clients)
+    assert all(len(packet) <= 250 for packet in request_packets)
+    
+    challenge = await auth.handle_batch_requests(request_packets)
+    assert challenge['accepted'] == len(clients)
+    
+    responses = [
+        auth.solve_batch_challenge(key, nonce, challenge['packet'])
+        for key, (nonce, _) in zip(clients, requests)
+    ]
+    # One client answers with the wrong key
+    responses[0] = auth.solve_batch_challenge(SigningKey.generate(), requests[0][0], challenge['packet'])
+    
+    response_packets = pack_entries(AUTH_BATCH_RESPONSE, responses)
+    
+    # A reply packet too small for any token fails before issuing sessions
+    with pytest.raises(ValueError):
+        await auth.handle_batch_responses(response_packets, packet_size=32)
+    assert len(auth.batch_challenges) == len(clients)
+    assert not auth.sessions
+    
+    token_packets = await auth.handle_batch_responses(response_packets)
+    tokens = auth.read_batch_tokens(token_packets)
+    
+    assert len(tokens) == len(clients) - 1
+    assert len(token_packets) < len(tokens)
+    assert all(len(packet) <= 250 for packet in token_packets)
+    assert requests[0][0] not in tokens
+    verified = await auth.verify_token(tokens[requests[5][0]])
+    assert verified['user_id'] == "handheld-5"
+    verified = await auth.verify_token(tokens[requests[1][0]])
+    assert verified['user_id'] == "h" * 60
+
+@pytest.mark.asyncio
+async def test_batch_request_flood_does_not_block_signed_flow():
+    auth = ReticulumAuth()
+    junk = [
+        auth.create_batch_request(SigningKey.generate(), f"junk-{i}", "storage:read")[1]
+        for i in range(auth.max_pending_batch_challenges + 50)
+    ]
+    challenge = await auth.handle_batch_requests(pack_entries(AUTH_BATCH_REQUEST, junk))
+    assert challenge['accepted'] == auth.max_pending_batch_challenges
+    
+    result = await auth.authenticate("test_user", "site:read", SigningKey.generate())
+    assert await auth.verify_token(result['token'])
+
+@pytest.mark.asyncio
+async def test_batch_malformed_entries_skipped():
+    auth = ReticulumAuth()
+    clients = [SigningKey.generate() for _ in range(3)]
+    requests = [
+        auth.create_batch_request(key, f"handheld-{i}", "storage:read")
+        for i, key in enumerate(clients)
+    ]
+    entries = [entry for _, entry in requests]
+    
+    # Short and undecodable entries are skipped, not fatal to the batch
+    malformed = [b'short', entries[0][:52] + b'\xff\xfe\n']
+    challenge = await auth.handle_batch_requests(
+        pack_entries(AUTH_BATCH_REQUEST, malformed + entries) + [b'\x01']
+    )
+    assert challenge['accepted'] == len(clients)
+    
+    # A junk response or a forged one does not consume any challenge
+    responses = [
+        auth.solve_batch_challenge(key, nonce, challenge['packet'])
+        for key, (nonce, _) in zip(clients, requests)
+    ]
+    forged = auth.solve_batch_challenge(SigningKey.generate(), requests[1][0], challenge['packet'])
+    token_packets = await auth.handle_batch_responses(
+        pack_entries(AUTH_BATCH_RESPONSE, [b'junk', forged, responses[0]])
+    )
+    assert list(auth.read_batch_tokens(token_packets)) == [requests[0][0]]
+    assert len(auth.batch_challenges) == len(clients) - 1
+    
+    token_packets = await auth.handle_batch_responses(
+        pack_entries(AUTH_BATCH_RESPONSE, responses)
+    )
+    assert len(auth.read_batch_tokens(token_packets)) == len(clients) - 1
+
+@pytest.mark.asyncio
+async def test_verification_cache_resists_forged_token_flood():
+    auth = StorageAuth()
+    result = await auth.authorize_access("test_user", "/test/path", "read")
+    assert await auth.validate_access(result['token'], "/test/path", "read") is True
+    
+    # Distinct forged tokens neither evict valid entries nor pass the
+    # shared failure limit
+    for i in range(auth.cache.max_entries + 100):
+        assert await auth.validate_access(f"forged-{i}", "/test/path", "read") is False
+    assert len(auth.cache.negative) <= auth.cache.max_negative_entries
+    assert auth.cache.is_rate_limited("forged-new") is True
+    
+    hits = auth.cache.stats['hits']
+    assert await auth.validate_access(result['token'], "/test/path", "read") is True
+    assert auth.cache.stats['hits'] == hits + 1
+    
+    # Tokens issued during the flood still pass
+    fresh = await auth.authorize_access("new_user", "/test/path", "read")
+    assert await auth.validate_access(fresh['token'], "/test/path", "read") is True
+    
+    reticulum = ReticulumAuth()
+    for i in range(reticulum.cache.global_failure_limit + 50):
+        assert await reticulum.verify_token(f"forged-{i}") is False
+    session = await reticulum.authenticate("new_user", "site:read", SigningKey.generate())
+    assert (await reticulum.verify_token(session['token']))['user_id'] == "new_user"
\ No newline at end of file
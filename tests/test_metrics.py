@@ -0,0 +1,96 @@
+import pytest
+import asyncio
+from types import SimpleNamespace
+from nacl.signing import SigningKey
+from src.utils.metrics import MetricsRegistry, metrics, NOOP_SPAN
+from src.transport.secure_transport import SecureReticulumTransport
+from src.transport.dispatch import PacketDispatcher
+from src.auth import ReticulumAuth
+
+@pytest.mark.asyncio
+async def test_metrics_registry_export(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc('packets_total', type='data')
+    assert registry.value('packets_total', type='data') is None
+    assert registry.span('idle') is NOOP_SPAN
+    
+    registry.enable()
+    registry.describe('packets_total', "Packets received")
+    registry.inc('packets_total', type='data')
+    registry.inc('packets_total', 2, type='data')
+    registry.set('queue_depth', 7, plane='control')
+    registry.observe('read_seconds', 0.02, peer='a"b')
+    
+    with registry.span('outer'):
+        with registry.span('inner', peer='a'):
+            pass
+    inner, outer = registry.spans
+    assert inner['parent_id'] == outer['span_id']
+    assert inner['trace_id'] == outer['trace_id']
+    assert registry.summary('inner_seconds', peer='a')['count'] == 1
+    
+    text = registry.render_prometheus()
+    assert '# HELP packets_total Packets received' in text
+    assert 'packets_total{type="data"} 3' in text
+    assert 'queue_depth{plane="control"} 7' in text
+    assert 'read_seconds_bucket{peer="a\\"b",le="0.01"} 0' in text
+    assert 'read_seconds_bucket{peer="a\\"b",le="0.05"} 1' in text
+    assert 'read_seconds_count{peer="a\\"b"} 1' in text
+    
+    path = tmp_path / "metrics.prom"
+    registry.write_file(str(path))
+    assert path.read_text() == text
+    
+    # Local scrape endpoint
+    server = await registry.serve(port=0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    response = await reader.read()
+    writer.close()
+    await registry.stop()
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert response.endswith(text.encode())
+
+@pytest.mark.asyncio
+async def test_hot_path_instrumentation(caplog):
+    metrics.reset()
+    metrics.enable()
+    try:
+        transport = SecureReticulumTransport()
+        session = await transport.establish_session('peer_a')
+        await transport.send_data(session['id'], b'x' * 400)
+        await transport.scheduler.stop()
+        
+        fragments = metrics.value('transport_fragments_sent_total', link='peer_a')
+        assert fragments == len(transport.fragment_data(b'x' * 400))
+        assert session['fragments_sent'] == fragments
+        assert metrics.value('transport_bytes_on_air_total', link='peer_a') == session['bytes_on_air'] > 400
+        assert metrics.value('transport_airtime_seconds_total', link='peer_a') > 0
+        
+        auth = ReticulumAuth()
+        result = await auth.authenticate(
+            user_id="test_user",
+            scope="site:read",
+            signing_key=SigningKey.generate()
+        )
+        await auth.verify_token(result['token'])
+        await auth.verify_token(result['token'])
+        assert metrics.value('auth_token_checks_total', result='valid') == 1
+        assert metrics.value('auth_token_checks_total', result='cached') == 1
+        assert metrics.summary('auth_authenticate_seconds')['count'] == 1
+        
+        async def broken(packet):
+            raise RuntimeError("bad route")
+            
+        dispatcher = PacketDispatcher(workers=1)
+        dispatcher.register('route', broken)
+        await dispatcher.start()
+        dispatcher.submit(SimpleNamespace(type='route'))
+        await dispatcher.join()
+        await dispatcher.stop()
+        assert metrics.value('dispatch_errors_total', type='route') == 1
+        assert "bad route" in caplog.text
+    finally:
+        metrics.disable()
+        metrics.reset()
\ No newline at end of file
@@ -1,6 +1,11 @@
 import pytest
 import asyncio
+import os
 from src.storage import RemoteStorageSystem, DistributedStorageManager
+from src.utils import delta, streams
+from src.utils.crypto import CryptoHandler, NodeKeyContext
+from src.utils.sync import SyncManager
+from src.web import ContentManager
 
 @pytest.mark.asyncio
 async def test_remote_storage():
@@ -48,4 +53,253 @@ async def test_storage_errors():
     
     # Test non-existent file
     with pytest.raises(FileNotFoundError):
-        await storage.retrieve_data("/nonexistent/file.txt")
\ No newline at end of file
+        await storage.retrieve_data("/nonexistent/file.txt")
+
+class Peer:
+    def __init__(self, id, hops=1):
+        self.id = id
+        self.hops = hops
+
+@pytest.mark.asyncio
+async def test_peer_content_cache():
+    storage = DistributedStorageManager()
+    page = b"<html>popular page</html>"
+    content_id = CryptoHandler.content_id(page)
+    storage.peers = {
+        'origin': Peer('origin', hops=4),
+        'near': Peer('near', hops=1),
+        'liar': Peer('liar', hops=1)
+    }
+    storage.content_index['/content/page'] = {'peers': ['origin']}
+    requests = []
+    
+    async def retrieve_from_peer(peer, key):
+        requests.append(peer.id)
+        return b"tampered" if peer.id == 'liar' else page
+        
+    storage.retrieve_from_peer = retrieve_from_peer
+    
+    # A neighbor advertising a bad copy is skipped and forgotten
+    await storage.handle_cache_advert({'node': 'liar', 'content_ids': [content_id]})
+    assert await storage.retrieve_distributed('/content/page', content_id) == page
+    assert requests == ['liar', 'origin']
+    assert storage.cache.find_providers(content_id) == []
+    
+    # Verified copies are then served locally and advertised
+    assert await storage.retrieve_distributed('/content/page', content_id) == page
+    assert requests == ['liar', 'origin']
+    assert content_id in storage.cache_advertisement('self')['content_ids']
+    
+    # Other nodes fetch from the nearby cache instead of the origin
+    other = DistributedStorageManager()
+    other.peers = storage.peers
+    other.content_index = storage.content_index
+    other.retrieve_from_peer = retrieve_from_peer
+    await other.handle_cache_advert(dict(storage.cache_advertisement('near')))
+    assert await other.retrieve_distributed('/content/page', content_id) == page
+    assert requests[-1] == 'near'
+
+@pytest.mark.asyncio
+async def test_publish_directory(tmp_path):
+    site = tmp_path / "site"
+    (site / "css").mkdir(parents=True)
+    (site / "index.html").write_text("<h1>Home</h1>" * 50)
+    (site / "about.md").write_text("# About")
+    (site / "css" / "style.css").write_text("body { color: red; }")
+    (site / "css" / "copy.css").write_text("body { color: red; }")
+    video = os.urandom(3000)
+    (site / "intro.webm").write_bytes(video)
+    
+    manager = ContentManager()
+    manager.storage.storage_path = str(tmp_path / "store")
+    result = await manager.publish_directory(
+        str(site), {'title': 'Bulk'}, workers=2, batch_size=2, stream_threshold=2048
+    )
+    
+    manifest = result['manifest']
+    assert manifest['pages']['/index.html']['type'] == 'html'
+    assert manifest['pages']['/about.md']['type'] == 'markdown'
+    assert manifest['resources']['/css/style.css']['type'] == 'text/css'
+    
+    # Identical files share one stored object
+    assert result['stats'] == {'files': 5, 'bytes': 3697, 'stored': 4}
+    
+    index = manifest['pages']['/index.html']
+    retrieved = await manager.storage.retrieve_data(index['storage_path'])
+    assert retrieved['data'] == b"<h1>Home</h1>" * 50
+    assert retrieved['metadata']['compressed']
+    
+    # Files above the threshold are streamed rather than batched
+    intro = manifest['resources']['/intro.webm']
+    retrieved = await manager.storage.retrieve_data(intro['storage_path'])
+    assert retrieved['data'] == video
+    assert retrieved['metadata']['chunked']
+    assert retrieved['metadata']['content_id'] == intro['id']
+
+@pytest.mark.asyncio
+async def test_node_keys_shared_and_persisted(tmp_path):
+    key_path = str(tmp_path / "keys" / "node_key.json")
+    
+    # Components on one node share keys, and nothing is generated until used
+    context = NodeKeyContext.shared(key_path)
+    storage = RemoteStorageSystem()
+    storage.crypto = CryptoHandler(context)
+    storage.storage_path = str(tmp_path / "store")
+    assert context.keys is None
+    assert CryptoHandler(NodeKeyContext.shared(key_path)).context is context
+    
+    await storage.store_data("/persisted.txt", b"secret", {'encrypt': True})
+    assert os.stat(key_path).st_mode & 0o777 == 0o600
+    
+    # A fresh context on the same key file reads it back after a restart
+    restarted = RemoteStorageSystem()
+    restarted.crypto = CryptoHandler(NodeKeyContext(key_path))
+    restarted.storage_path = storage.storage_path
+    retrieved = await restarted.retrieve_data("/persisted.txt")
+    assert retrieved['data'] == b"secret"
+    assert restarted.crypto.public_signing_key == storage.crypto.public_signing_key
+    
+    assert CryptoHandler(NodeKeyContext.ephemeral()).key != storage.crypto.key
+
+@pytest.mark.asyncio
+async def test_delta_sync(tmp_path):
+    page = b"".join(b"<p>Paragraph %d of a mesh page</p>\n" % i for i in range(2000))
+    edited = page[:30000] + b"<p>Inserted</p>\n" + page[30000:]
+    
+    # A small edit costs a small fraction of the page
+    message = delta.make_update(delta.signature(page), edited)
+    assert message['type'] == 'delta'
+    assert delta.update_size(message) < len(edited) // 20
+    assert delta.apply_update(page, message) == edited
+    with pytest.raises(delta.DeltaError):
+        delta.apply_update(edited, message)
+        
+    # Sync sends the first version whole and later ones as deltas
+    sent = []
+    async def send_update(item, update):
+        sent.append(update)
+    sync = SyncManager(send_update)
+    await sync.sync_item({'id': 'page', 'data': page})
+    await sync.sync_item({'id': 'page', 'data': edited})
+    assert [update['type'] for update in sent] == ['full', 'delta']
+    assert sync.apply_update(sync.apply_update(None, sent[0]), sent[1]) == edited
+    assert sync.stats['bytes_sent'] < len(page) + len(edited) // 20
+    
+    # Stored objects sync as deltas, and a rejected delta resets to a full copy
+    storage = RemoteStorageSystem()
+    storage.storage_path = str(tmp_path)
+    replica = {}
+    sent = []
+    async def apply_on_replica(item, update):
+        replica[item['id']] = delta.apply_update(replica.get(item['id']), update)
+        sent.append(update['type'])
+    storage.sync.send_update = apply_on_replica
+    worker = asyncio.create_task(storage.sync.process_queue())
+    
+    for version in (page, edited, edited + b"<p>1</p>", edited + b"<p>2</p>", edited + b"<p>3</p>"):
+        if version.endswith(b"<p>2</p>"):
+            replica.clear()
+        await storage.store_data("/site/index.html", version)
+        await storage.sync.sync_queue.join()
+    worker.cancel()
+    assert sent == ['full', 'delta', 'delta', 'full']
+    assert replica["/site/index.html"] == edited + b"<p>3</p>"
+    
+    # Replicas answer delta reads; a failing replica falls back to a full read
+    storage = DistributedStorageManager()
+    storage.peers = {'a': Peer('a'), 'b': Peer('b')}
+    storage.content_index['page'] = {'peers': ['a', 'b']}
+    async def retrieve_delta_from_peer(peer, key, signature):
+        if peer.id == 'a':
+            raise ConnectionError("unreachable")
+        return storage.serve_delta(edited, signature)
+    storage.retrieve_delta_from_peer = retrieve_delta_from_peer
+    assert await storage.retrieve_delta('page', page) == edited
+    
+    async def retrieve_from_peer(peer, key):
+        return edited
+    storage.retrieve_delta_from_peer = None
+    storage.retrieve_from_peer = retrieve_from_peer
+    assert await storage.retrieve_delta('page', page) == edited
+
+@pytest.mark.asyncio
+async def test_streaming_storage(tmp_path):
+    storage = RemoteStorageSystem()
+    storage.storage_path = str(tmp_path)
+    data = os.urandom(300 * 1024 + 7)
+    
+    # Odd-sized input chunks are re-sliced and encrypted chunk by chunk
+    chunks = (data[i:i + 10000] for i in range(0, len(data), 10000))
+    result = await storage.store_stream("/media/video.bin", chunks, {'chunk_size': 64 * 1024})
+    assert result['metadata']['size'] == len(data)
+    assert result['metadata']['content_id'] == CryptoHandler.content_id(data)
+    
+    received = [chunk async for chunk in storage.retrieve_stream("/media/video.bin")]
+    assert max(len(chunk) for chunk in received) <= 64 * 1024
+    assert b''.join(received) == data
+    assert (await storage.retrieve_data("/media/video.bin"))['data'] == data
+    
+    # Objects stored whole still stream
+    await storage.store_data("/small.txt", b"small object")
+    assert await streams.collect(storage.retrieve_stream("/small.txt")) == b"small object"
+    
+    # Dropped chunks and chunks spliced in from another object are detected
+    await storage.store_stream("/media/other.bin", os.urandom(len(data)), {'chunk_size': 64 * 1024})
+    
+    def read_frames(path):
+        with open(storage.object_path(path), 'rb') as f:
+            stored = f.read()
+        frames = []
+        offset = 0
+        while offset < len(stored):
+            length = streams.FRAME_LENGTH.unpack_from(stored, offset)[0] + streams.FRAME_LENGTH.size
+            frames.append(stored[offset:offset + length])
+            offset += length
+        return frames
+        
+    frames = read_frames("/media/video.bin")
+    other = read_frames("/media/other.bin")
+    for tampered in (frames[:-1], frames[:1] + other[1:2] + frames[2:], other):
+        with open(storage.object_path("/media/video.bin"), 'wb') as f:
+            f.write(b''.join(tampered))
+        with pytest.raises(streams.StreamError):
+            await streams.collect(storage.retrieve_stream("/media/video.bin"))
+
+@pytest.mark.asyncio
+async def test_streaming_distributed_storage():
+    storage = DistributedStorageManager()
+    storage.peers = {name: Peer(name) for name in 'abc'}
+    replicas = {}
+    
+    async def find_storage_peers(count):
+        return list(storage.peers.values())[:count]
+        
+    async def store_stream_on_peer(peer, key, chunks):
+        if peer.id == 'b':
+            raise ConnectionError("unreachable")
+        replicas[peer.id] = b''
+        async for chunk in chunks:
+            replicas[peer.id] += chunk
+            await asyncio.sleep(0)
+        return {'peer': peer.id}
+        
+    storage.find_storage_peers = find_storage_peers
+    storage.store_stream_on_peer = store_stream_on_peer
+    data = os.urandom(200 * 1024)
+    chunks = (data[i:i + 4096] for i in range(0, len(data), 4096))
+    result = await storage.store_stream("video", chunks, {'chunk_size': 16 * 1024, 'window': 2})
+    assert result['stored_copies'] == 2
+    assert replicas == {'a': data, 'c': data}
+    assert storage.content_index['video']['size'] == len(data)
+    
+    # A replica failing mid-stream is resumed from the next one
+    async def retrieve_stream_from_peer(peer, key, offset):
+        if peer.id == 'b':
+            raise ConnectionError("unreachable")
+        for i in range(offset, len(data), 16 * 1024):
+            if peer.id == 'a' and i >= 64 * 1024:
+                raise ConnectionError("link dropped")
+            yield data[i:i + 16 * 1024]
+            
+    storage.retrieve_stream_from_peer = retrieve_stream_from_peer
+    assert await streams.collect(storage.retrieve_stream("video")) == data
\ No newline at end of file
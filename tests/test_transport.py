@@ -0,0 +1,395 @@
+import pytest
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from src.transport.mesh_networky import ReticulumMeshNetwork
+from src.transport.discovery import PeerDiscovery
+from src.transport.dispatch import PacketDispatcher, CONTROL, DATA
+from src.transport.scheduler import TransmitScheduler, PRIORITY_CONTROL, PRIORITY_BULK
+from src.transport.secure_transport import SecureReticulumTransport
+from src.transport.simulator import MeshSimulator, PacketLost
+from src.storage.distributed_storage import DistributedStorageManager
+from src.utils.sync import SyncManager
+
+@pytest.mark.asyncio
+async def test_route_cache():
+    mesh = ReticulumMeshNetwork()
+    mesh.peers['peer_a'] = {'id': 'peer_a'}
+    discoveries = []
+    
+    async def discover_route(peer_id):
+        discoveries.append(peer_id)
+        return {'next_hop': peer_id, 'hops': 1}
+        
+    mesh.discover_route = discover_route
+    
+    # First send discovers, later sends reuse the cached route
+    for _ in range(3):
+        result = await mesh.send_to_peer('peer_a', b'data')
+        assert result['status'] == 'sent'
+    assert discoveries == ['peer_a']
+    assert mesh.routes.get('peer_a')['metrics']['sent'] == 3
+
+@pytest.mark.asyncio
+async def test_stale_route_revalidated_in_background():
+    mesh = ReticulumMeshNetwork()
+    mesh.peers['peer_a'] = {'id': 'peer_a'}
+    mesh.routes.update('peer_a', {
+        'next_hop': 'peer_a',
+        'hops': 1,
+        'last_validated': datetime.now() - timedelta(seconds=3700)
+    })
+    
+    async def discover_route(peer_id):
+        raise AssertionError("send must not block on discovery")
+        
+    mesh.discover_route = discover_route
+    
+    # Stale route is served immediately and refreshed off the send path
+    result = await mesh.send_to_peer('peer_a', b'data')
+    assert result['status'] == 'sent'
+    await asyncio.gather(*mesh.revalidations.values())
+    assert mesh.routes.state(mesh.routes.get('peer_a')) == 'fresh'
+
+@pytest.mark.asyncio
+async def test_link_quality_routing():
+    mesh = ReticulumMeshNetwork()
+    mesh.peers['dest'] = {'id': 'dest'}
+    
+    # Direct but lossy link versus a clean two-hop path
+    mesh.update_link('local', 'dest', loss=0.9, snr=-15)
+    mesh.update_link('local', 'relay', loss=0.0, snr=5)
+    mesh.update_link('relay', 'dest', loss=0.0, snr=5)
+    
+    await mesh.send_to_peer('dest', b'data')
+    assert mesh.routes.get('dest')['path'] == ['local', 'relay', 'dest']
+    
+    # Relay degrades: cached route follows the new shortest path
+    mesh.update_link('relay', 'dest', loss=0.95, snr=-19)
+    assert mesh.routes.get('dest')['path'] == ['local', 'dest']
+    
+    mesh.remove_link('local', 'dest')
+    assert mesh.routes.get('dest')['path'] == ['local', 'relay', 'dest']
+
+@pytest.mark.asyncio
+async def test_multipath_transfer():
+    mesh = ReticulumMeshNetwork()
+    for relay in ('r1', 'r2', 'r3'):
+        mesh.update_link('local', relay, bandwidth=1200)
+        mesh.update_link(relay, 'dest', bandwidth=1200)
+        
+    data = bytes(range(256)) * 40
+    result = await mesh.send_multipath('dest', data)
+    
+    assert len(result['paths']) == 3
+    assert len({path[1] for path in result['paths']}) == 3
+    assert sum(result['segments']) == len(data)
+
+class Packet:
+    def __init__(self, type, data, **attrs):
+        self.type = type
+        self.data = data
+        self.__dict__.update(attrs)
+
+@pytest.mark.asyncio
+async def test_peer_discovery_duplicates_and_expiry():
+    mesh = ReticulumMeshNetwork()
+    announce = {'type': 'peer_discovery', 'node': 'peer_a', 'seq': 1}
+    
+    # Flooded copies of the same announce are dropped
+    await mesh.dispatcher.start()
+    await mesh.handle_packet(Packet('peer_discovery', announce, snr=3))
+    await mesh.dispatcher.join()
+    await mesh.handle_peer_discovery(Packet('peer_discovery', announce))
+    assert 'peer_a' in mesh.peers
+    assert mesh.discovery.stats['duplicates_dropped'] == 1
+    assert mesh.routes.get('peer_a') is None
+    assert mesh.routing.path_to('peer_a') == ['local', 'peer_a']
+    
+    # Peers that stop announcing expire from the TTL index
+    mesh.discovery.peer_ttl = 0
+    await mesh.handle_peer_discovery(Packet('peer_discovery', dict(announce, seq=2)))
+    mesh.handle_expired_peers(mesh.discovery.expire_peers())
+    assert 'peer_a' not in mesh.peers
+    assert 'peer_a' not in mesh.announcements
+    assert mesh.routing.path_to('peer_a') is None
+
+@pytest.mark.asyncio
+async def test_trickle_backoff():
+    sent = []
+    
+    async def send(announcement):
+        sent.append(announcement)
+        
+    discovery = PeerDiscovery('self', send, imin=0.01, imax=0.08)
+    task = asyncio.create_task(discovery.run())
+    await asyncio.sleep(0.3)
+    
+    # Stable neighborhood: interval has backed off to the maximum
+    assert discovery.trickle.interval == 0.08
+    assert sent and len({a['seq'] for a in sent}) == len(sent)
+    
+    # A new neighbor resets to the fastest rate
+    discovery.observe({'node': 'peer_b', 'seq': 1})
+    assert discovery.trickle.interval == 0.01
+    task.cancel()
+    
+    # A rebooted peer restarts its sequence but is not dropped as a duplicate
+    assert discovery.observe({'node': 'peer_b', 'seq': 1, 'boot': 'after-reboot'}) is not None
+
+@pytest.mark.asyncio
+async def test_trickle_dense_neighborhood_keeps_peers():
+    nodes = []
+    
+    def make_node(node_id):
+        async def send(announcement):
+            for node in nodes:
+                if node is not discovery:
+                    node.observe(dict(announcement))
+        discovery = PeerDiscovery(node_id, send, imin=0.01, imax=0.04)
+        return discovery
+        
+    # Suppressed nodes still refresh their presence before neighbors expire them
+    nodes.extend(make_node(f"node{i}") for i in range(12))
+    tasks = [asyncio.create_task(node.run()) for node in nodes]
+    await asyncio.sleep(1.0)
+    for task in tasks:
+        task.cancel()
+        
+    assert sum(node.stats['peers_expired'] for node in nodes) == 0
+    assert sum(node.stats['announces_suppressed'] for node in nodes) > 0
+    assert all(len(node.peers) == len(nodes) - 1 for node in nodes)
+    assert all(node.trickle.interval == 0.04 for node in nodes)
+
+@pytest.mark.asyncio
+async def test_control_packets_not_blocked_by_data():
+    mesh = ReticulumMeshNetwork()
+    mesh.dispatcher = PacketDispatcher(workers=2, control_workers=1, data_queue_size=2)
+    release = asyncio.Event()
+    handled = []
+    
+    async def slow_data(packet):
+        await release.wait()
+        handled.append(packet.type)
+        
+    async def route_update(packet):
+        handled.append(packet.type)
+        
+    mesh.dispatcher.register('data', slow_data, DATA)
+    mesh.dispatcher.register('route', route_update, CONTROL)
+    await mesh.dispatcher.start()
+    
+    # Fill the data plane, then overflow it
+    for _ in range(4):
+        await mesh.handle_packet(Packet('data', b'chunk'))
+    await asyncio.sleep(0)
+    await mesh.handle_packet(Packet('route', {'node': 'a', 'links': {}}))
+    await asyncio.sleep(0.01)
+    
+    assert handled == ['route']
+    assert mesh.dispatcher.stats['dropped']['data'] == 2
+    
+    release.set()
+    await mesh.dispatcher.join()
+    assert handled.count('data') == 2
+    await mesh.dispatcher.stop()
+
+@pytest.mark.asyncio
+async def test_secure_transport_fragments_fit_mtu():
+    transport = SecureReticulumTransport()
+    session = await transport.establish_session(peer_id='peer_a')
+    sent = []
+    
+    async def transmit(peer_id, packet):
+        sent.append(packet)
+        return {'status': 'sent'}
+        
+    transport.scheduler.transmit = transmit
+    result = await transport.send_data(session['id'], b'x' * 1009)
+    
+    assert result['total_bytes'] == 1009
+    assert all(len(p) + transport.header_size <= transport.packet_size for p in sent)
+    sizes = [len(f) for f in transport.fragment_data(b'x' * 1009)]
+    assert max(sizes) - min(sizes) <= 1
+
+@pytest.mark.asyncio
+async def test_scheduler_priority_deadline_and_duty_cycle():
+    sent = []
+    
+    async def transmit(link, payload):
+        sent.append(payload)
+        return {'status': 'sent'}
+        
+    # 100 bytes/s with a 50% duty cycle over a 0.4s window: 0.2s of airtime
+    scheduler = TransmitScheduler(transmit, bandwidth=100, duty_cycle=0.5, window=0.4, overhead=0)
+    bulk = [scheduler.submit('a', b'b' * 10, PRIORITY_BULK) for _ in range(3)]
+    expired = scheduler.submit('a', b'late', PRIORITY_BULK, deadline=time.monotonic() - 1)
+    control = scheduler.submit('a', b'c' * 10, PRIORITY_CONTROL)
+    
+    started = time.monotonic()
+    await asyncio.gather(control, *bulk)
+    
+    assert sent[0] == b'c' * 10
+    assert len(sent) == 4
+    # Four 0.1s transmissions need a second window
+    assert time.monotonic() - started >= 0.35
+    assert scheduler.stats['duty_cycle_waits'] > 0
+    with pytest.raises(TimeoutError):
+        await expired
+    await scheduler.stop()
+
+@pytest.mark.asyncio
+async def test_scheduler_budget_shared_across_peers():
+    on_air = []
+    
+    async def transmit(link, payload):
+        on_air.append(link)
+        assert len(on_air) - len(done) == 1
+        await asyncio.sleep(0)
+        done.append(link)
+        return {'status': 'sent'}
+        
+    # One radio, one budget: eight peers cannot multiply the duty cycle
+    done = []
+    scheduler = TransmitScheduler(transmit, bandwidth=100, duty_cycle=0.5, window=0.2, overhead=0)
+    started = time.monotonic()
+    await asyncio.gather(*[
+        scheduler.submit(f"peer-{i}", b'x' * 5, PRIORITY_BULK)
+        for i in range(8)
+    ])
+    assert len(done) == 8
+    assert scheduler.stats['duty_cycle_waits'] > 0
+    assert time.monotonic() - started >= 0.3
+    await scheduler.stop()
+    
+    with pytest.raises(ValueError):
+        TransmitScheduler(transmit, region='XX433')
+
+@pytest.mark.asyncio
+async def test_simulated_mesh_end_to_end():
+    simulator = MeshSimulator(seed=1, bandwidth=1000, latency=0.1)
+    networks = {}
+    for node_id in ('a', 'b', 'c', 'd'):
+        networks[node_id] = ReticulumMeshNetwork()
+        simulator.attach(networks[node_id], node_id)
+        await networks[node_id].initialize()
+    for a, b in (('a', 'b'), ('b', 'c'), ('c', 'd')):
+        simulator.connect(a, b, snr=5)
+        
+    # Announces flood the mesh; only neighbors are heard first-hand
+    await simulator.announce_all()
+    assert set(networks['a'].peers) == {'b', 'c', 'd'}
+    assert networks['a'].routing.path_to('b') == ['local', 'b']
+    assert networks['a'].routing.path_to('d') is None
+    
+    simulator.converge()
+    await simulator.advance(simulator.horizon)
+    received = []
+    
+    async def receiver(packet):
+        received.append(packet)
+        
+    networks['d'].data_receiver = receiver
+    result = await networks['a'].send_to_peer('d', b'x' * 180)
+    await networks['d'].dispatcher.join()
+    
+    assert received[0].data == b'x' * 180
+    assert result['hops'] == 3
+    # Three hops of 0.2s airtime and 0.1s propagation each
+    assert result['latency'] == pytest.approx(0.9)
+    
+    # The transport sends over the same virtual radios
+    transport = SecureReticulumTransport(interface=simulator.nodes['a'])
+    session = await transport.establish_session('c')
+    await transport.send_data(session['id'], b'y' * 500)
+    assert simulator.stats['delivered'] == 1 + len(transport.fragment_data(b'y' * 500))
+    await transport.scheduler.stop()
+    
+    # A dead link loses the packet and marks the route for revalidation
+    simulator.connect('c', 'd', loss=1.0)
+    with pytest.raises(PacketLost):
+        await networks['a'].send_to_peer('d', b'x')
+    assert simulator.summary()['lost'] == 1
+    
+    for network in networks.values():
+        await network.shutdown()
+
+@pytest.mark.asyncio
+async def test_simulated_replication():
+    simulator = MeshSimulator(seed=1, bandwidth=1000, latency=0.1)
+    managers = {}
+    for node_id in ('a', 'b', 'c', 'd', 'e'):
+        managers[node_id] = DistributedStorageManager()
+    sync = SyncManager(block_size=64)
+    adapters = {
+        node_id: simulator.attach_storage(manager, node_id, sync if node_id == 'a' else None)
+        for node_id, manager in managers.items()
+    }
+    for a, b in (('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'e')):
+        simulator.connect(a, b)
+        
+    # Replicas land on the nearest storage nodes
+    page = os.urandom(2000)
+    result = await managers['a'].store_distributed('/content/page', page, {'replication_factor': 2})
+    assert result['stored_copies'] == 2
+    assert result['peers'] == ['b', 'c']
+    assert adapters['c'].replicas['/content/page'] == page
+    
+    # A later version syncs to the replicas as a delta
+    await sync.sync_item({'id': '/content/page', 'data': page})
+    edited = page[:1000] + b'edited' + page[1000:]
+    await sync.sync_item({'id': '/content/page', 'data': edited})
+    assert sync.stats['delta_updates'] == 1
+    assert sync.stats['bytes_sent'] < len(page) + 200
+    assert adapters['b'].replicas['/content/page'] == edited
+    assert adapters['c'].replicas['/content/page'] == edited
+    
+    # Reads fail over to the next replica when the nearest is cut off
+    simulator.connect('a', 'b', loss=1.0)
+    assert await managers['a'].retrieve_distributed('/content/page') == edited
+    assert adapters['a'].stats['failed'] == 1
+    
+    summary = simulator.summary()
+    assert summary['lost'] == 1
+    assert summary['airtime'] > 0
+
+@pytest.mark.asyncio
+async def test_simulated_duty_cycle():
+    simulator = MeshSimulator(bandwidth=100, latency=0, duty_cycle=0.5, window=10, overhead=0)
+    simulator.add_node('a')
+    simulator.add_node('b')
+    simulator.connect('a', 'b')
+    
+    # 5s of airtime fits the window, the rest waits for it to roll over
+    results = [await simulator.send('a', 'b', b'x' * 100) for _ in range(6)]
+    assert [r['latency'] for r in results[:5]] == pytest.approx([1, 2, 3, 4, 5])
+    assert results[5]['latency'] == pytest.approx(11)
+    assert simulator.stats['duty_cycle_waits'] == 1
+
+@pytest.mark.asyncio
+async def test_secure_transport_send_stream():
+    transport = SecureReticulumTransport()
+    session = await transport.establish_session(peer_id='peer_a')
+    data = bytes(range(256)) * 40
+    sent = []
+    in_flight = 0
+    peak = 0
+    
+    async def send_packet(session, packet, priority, deadline):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        sent.append(packet)
+        in_flight -= 1
+        
+    # Chunks of any size go out as full fragments with a bounded window
+    transport.send_packet = send_packet
+    chunks = (data[i:i + 1000] for i in range(0, len(data), 1000))
+    result = await transport.send_stream(session['id'], chunks, window=4)
+    
+    assert result['total_bytes'] == len(data)
+    assert peak <= 4
+    assert all(len(p) + transport.header_size <= transport.packet_size for p in sent)
+    assert b''.join(transport.crypto.decrypt_data(p) for p in sent) == data
\ No newline at end of file